@@ -1,18 +1,258 @@
 import asyncio
 import logging
-import random
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from itertools import chain
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
 import aiohttp
 import json
-from models.database_models import League, Team, Match, TeamStats, Prediction
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from models.database_models import League, Team, Match, TeamStats, Prediction, generate_ids
+from scrapers.mongo_writes import log_duplicate_write_errors
 
 logger = logging.getLogger(__name__)
 
+# Takım istatistiği pipeline'ı $lastN (5.2+), eğitim özellikleri $setWindowFields (5.0+) kullanır
+MIN_MONGO_VERSION = (5, 2)
+
+# (koleksiyon, anahtarlar, create_index seçenekleri)
+COLLECTOR_INDEXES = (
+    ("matches", [("home_team_id", 1), ("away_team_id", 1), ("match_date", 1)], {"unique": True}),
+    ("matches", [("league_id", 1), ("status", 1), ("match_date", 1)], {}),
+    ("team_stats", [("team_id", 1), ("season", 1)], {"unique": True}),
+    ("predictions", [("match_id", 1), ("bet_type", 1)], {"unique": True}),
+    # Farklı kaynaklar aynı isimli takım ekleyebildiği için unique değil
+    ("teams", [("league_id", 1), ("name", 1)], {}),
+)
+
+
+def _random_odds(rng: np.random.Generator, n: int) -> Dict[str, List[float]]:
+    """n maç için rastgele bahis oranları üret"""
+    return {
+        "1": np.round(rng.uniform(1.5, 4.5, n), 2).tolist(),
+        "X": np.round(rng.uniform(2.8, 4.2, n), 2).tolist(),
+        "2": np.round(rng.uniform(1.8, 5.0, n), 2).tolist(),
+        "over": np.round(rng.uniform(1.7, 2.3, n), 2).tolist(),
+        "under": np.round(rng.uniform(1.7, 2.3, n), 2).tolist(),
+        "yes": np.round(rng.uniform(1.6, 2.2, n), 2).tolist(),
+        "no": np.round(rng.uniform(1.6, 2.2, n), 2).tolist()
+    }
+
+
+def _odds_at(odds: Dict[str, List[float]], k: int) -> Dict[str, Dict[str, float]]:
+    """k. maçın oran alanlarını Match formatında döndür"""
+    return {
+        "odds_1x2": {"1": odds["1"][k], "X": odds["X"][k], "2": odds["2"][k]},
+        "odds_over_under": {"over": odds["over"][k], "under": odds["under"][k]},
+        "odds_btts": {"yes": odds["yes"][k], "no": odds["no"][k]}
+    }
+
+
+def _random_match_stats(rng: np.random.Generator, n: int) -> Dict[str, List[Any]]:
+    """n tamamlanmış maç için skor, xG ve istatistik değerleri üret"""
+    # .tolist() native int'e çevirir; pymongo sığan int'leri BSON int32 olarak yazar
+    return {
+        "home_score": rng.choice(5, size=n, p=[0.10, 0.30, 0.35, 0.20, 0.05]).tolist(),
+        "away_score": rng.choice(5, size=n, p=[0.15, 0.35, 0.30, 0.15, 0.05]).tolist(),
+        "home_xg": np.round(rng.uniform(0.5, 3.5, n), 2).tolist(),
+        "away_xg": np.round(rng.uniform(0.5, 3.5, n), 2).tolist(),
+        "home_shots": rng.integers(8, 21, n).tolist(),
+        "away_shots": rng.integers(6, 19, n).tolist(),
+        "home_shots_on_target": rng.integers(3, 9, n).tolist(),
+        "away_shots_on_target": rng.integers(2, 8, n).tolist(),
+        "home_corners": rng.integers(2, 13, n).tolist(),
+        "away_corners": rng.integers(2, 11, n).tolist(),
+        "home_yellow_cards": rng.integers(0, 5, n).tolist(),
+        "away_yellow_cards": rng.integers(0, 5, n).tolist(),
+        "home_red_cards": rng.integers(0, 2, n).tolist(),
+        "away_red_cards": rng.integers(0, 2, n).tolist()
+    }
+
+
+def _iter_match_docs(league_id: str, weeks: Iterable[int], rounds: List[List[Tuple[str, str]]],
+                     status: str, rng: np.random.Generator, now: datetime,
+                     first_gameweek: int) -> Iterator[Dict[str, Any]]:
+    """Verilen haftalar için maç dokümanları üret; tamamlanmış maçlara skor ve istatistik ekle"""
+    n = sum(len(pairs) for pairs in rounds)
+    ids = generate_ids(n)
+    odds = _random_odds(rng, n)
+    stats = _random_match_stats(rng, n) if status == "finished" else {}
+    
+    k = 0
+    for gameweek, (week, pairs) in enumerate(zip(weeks, rounds), start=first_gameweek):
+        match_date = now + timedelta(weeks=week)
+        
+        for home_team, away_team in pairs:
+            # Değerler zaten doğru tipte üretiliyor, doğrulamayı atla
+            match = Match.model_construct(
+                id=ids[k],
+                league_id=league_id,
+                home_team_id=home_team,
+                away_team_id=away_team,
+                match_date=match_date,
+                season="2024-25",
+                gameweek=gameweek,
+                status=status,
+                created_at=now,
+                updated_at=now,
+                **{field: values[k] for field, values in stats.items()},
+                **_odds_at(odds, k)
+            )
+            k += 1
+            yield match.model_dump()
+
+
+def _round_robin(team_ids: List[str], n_rounds: int) -> List[List[Tuple[str, str]]]:
+    """Circle yöntemiyle haftalık (ev sahibi, deplasman) eşleşmelerini üret"""
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)  # Bay geçen takım
+    
+    half = len(teams) // 2
+    rounds = []
+    for r in range(n_rounds):
+        pairs = [(teams[i], teams[-1 - i]) for i in range(half)]
+        if r % 2:
+            pairs = [(away, home) for home, away in pairs]  # Ev/deplasman dengesi
+        rounds.append([(home, away) for home, away in pairs if home is not None and away is not None])
+        # İlk takım sabit, diğerleri bir adım döner
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    
+    return rounds
+
+
+def _team_stats_pipeline(team_ids: List[str]) -> List[Dict[str, Any]]:
+    """Takım başına sezon istatistiklerini üreten aggregation pipeline'ı"""
+    # Her maçı ev sahibi ve deplasman için iki ayrı satıra böl
+    sides = [
+        {
+            "team_id": "$home_team_id",
+            "is_home": {"$literal": True},
+            "our": {"$ifNull": ["$home_score", 0]},
+            "opp": {"$ifNull": ["$away_score", 0]}
+        },
+        {
+            "team_id": "$away_team_id",
+            "is_home": {"$literal": False},
+            "our": {"$ifNull": ["$away_score", 0]},
+            "opp": {"$ifNull": ["$home_score", 0]}
+        }
+    ]
+    
+    # result = sign(our - opp) + 1 -> 0: L, 1: D, 2: W
+    counters = {
+        "matches_played": 1,
+        "wins": {"$cond": [{"$eq": ["$result", 2]}, 1, 0]},
+        "draws": {"$cond": [{"$eq": ["$result", 1]}, 1, 0]},
+        "losses": {"$cond": [{"$eq": ["$result", 0]}, 1, 0]},
+        "goals_for": "$our",
+        "goals_against": "$opp"
+    }
+    
+    group = {"_id": "$team_id"}
+    for field, expr in counters.items():
+        group[field] = {"$sum": expr}
+        group[f"home_{field}"] = {"$sum": {"$cond": ["$is_home", expr, 0]}}
+        group[f"away_{field}"] = {"$sum": {"$cond": ["$is_home", 0, expr]}}
+    group["clean_sheets"] = {"$sum": {"$cond": [{"$eq": ["$opp", 0]}, 1, 0]}}
+    # Sadece son 5 sonucu tut ($lastN, MongoDB 5.2+); tüm sezonu biriktirmez
+    group["last_5_form"] = {"$lastN": {
+        "input": {"$arrayElemAt": [["L", "D", "W"], "$result"]},
+        "n": 5
+    }}
+    
+    return [
+        {"$match": {
+            "$or": [{"home_team_id": {"$in": team_ids}}, {"away_team_id": {"$in": team_ids}}],
+            "status": "finished"
+        }},
+        {"$sort": {"match_date": 1}},
+        {"$project": {"_id": 0, "sides": sides}},
+        {"$unwind": "$sides"},
+        {"$replaceRoot": {"newRoot": "$sides"}},
+        {"$match": {"team_id": {"$in": team_ids}}},
+        {"$set": {"result": {"$add": [{"$cmp": ["$our", "$opp"]}, 1]}}},
+        {"$group": group},
+        {"$set": {
+            "avg_goals_for": {"$round": [{"$divide": ["$goals_for", "$matches_played"]}, 2]},
+            "avg_goals_against": {"$round": [{"$divide": ["$goals_against", "$matches_played"]}, 2]}
+        }}
+    ]
+
+
 class EnhancedDataCollector:
     def __init__(self, db):
         self.db = db
+    
+    async def check_server_version(self):
+        """MongoDB sürümü pipeline'ların gerektirdiğinden eskiyse açık hata ver"""
+        try:
+            info = await self.db.command('buildInfo')
+        except PyMongoError as e:
+            logger.warning(f"MongoDB sürümü doğrulanamadı: {e}")
+            return
+        
+        version = tuple(info.get('versionArray', [])[:2])
+        if version < MIN_MONGO_VERSION:
+            required = '.'.join(map(str, MIN_MONGO_VERSION))
+            raise RuntimeError(
+                f"MongoDB {info.get('version')} desteklenmiyor: $lastN / $setWindowFields için en az {required} gerekli"
+            )
+    
+    async def ensure_indexes(self):
+        """Demo veri sorgularının kullandığı index'leri oluştur
+
+        Her index ayrı denenir; biri başarısız olursa diğerleri yine oluşturulur.
+        Unique index mevcut tekrar eden kayıtlar yüzünden kurulamazsa önce bunlar
+        temizlenir.
+        """
+        for collection, keys, options in COLLECTOR_INDEXES:
+            try:
+                try:
+                    await self.db[collection].create_index(keys, **options)
+                except DuplicateKeyError:
+                    removed = await self._remove_duplicates(collection, [field for field, _ in keys])
+                    logger.warning(f"{collection} {keys}: {removed} tekrar eden kayıt silindi")
+                    await self.db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Index oluşturma hatası ({collection} {keys}): {e}")
+    
+    async def _remove_duplicates(self, collection: str, fields: List[str]) -> int:
+        """fields anahtarı tekrar eden belgelerden birini tutup diğerlerini sil -> silinen sayısı
+
+        Maçlarda en eski kayıt tutulur, silinenlerin dış ID'leri ona taşınır ve
+        silinen maçların tahminleri de silinir (sonraki tahmin turunda yeniden
+        üretilir). Tahmin ve istatistiklerde en yeni kayıt kalır.
+        """
+        is_matches = collection == "matches"
+        cursor = self.db[collection].aggregate([
+            {"$sort": {"_id": 1 if is_matches else -1}},
+            {"$group": {
+                "_id": {field: f"${field}" for field in fields},
+                "docs": {"$push": "$$ROOT"}
+            }},
+            {"$match": {"docs.1": {"$exists": True}}}
+        ], allowDiskUse=True)
+        
+        removed = 0
+        async for group in cursor:
+            kept, dropped = group['docs'][0], group['docs'][1:]
+            
+            if is_matches:
+                # Tutulan kaydın kendi dış ID'leri önceliklidir
+                external_ids = {}
+                for doc in reversed(group['docs']):
+                    external_ids.update(doc.get('external_ids') or {})
+                if external_ids:
+                    await self.db.matches.update_one({"_id": kept['_id']}, {"$set": {"external_ids": external_ids}})
+                await self.db.predictions.delete_many({"match_id": {"$in": [doc.get('id') for doc in dropped]}})
+            
+            result = await self.db[collection].delete_many({"_id": {"$in": [doc['_id'] for doc in dropped]}})
+            removed += result.deleted_count
         
+        return removed
+    
     async def generate_realistic_data(self):
         """Gerçekçi demo verisi oluştur"""
         try:
@@ -47,36 +287,45 @@ class EnhancedDataCollector:
                 {"name": "Wolves", "city": "Wolverhampton", "founded": 1877, "stadium": "Molineux Stadium"}
             ]
             
-            # Takımları ekle
-            team_ids = []
-            for team_data in epl_teams:
-                existing_team = await self.db.teams.find_one({
-                    "league_id": epl_league['id'],
-                    "name": team_data['name']
-                })
-                
-                if not existing_team:
-                    from models.database_models import Team
+            # Mevcut takımları tek sorguda al
+            existing_teams = await self.db.teams.find(
+                {"league_id": epl_league['id']},
+                {"name": 1, "id": 1}
+            ).to_list(None)
+            ids_by_name = {t['name']: t['id'] for t in existing_teams}
+            
+            # Eksik takımları toplu ekle
+            new_teams = []
+            ids = generate_ids(len(epl_teams))
+            now = datetime.utcnow()
+            for i, team_data in enumerate(epl_teams):
+                if team_data['name'] not in ids_by_name:
                     team = Team(
+                        id=ids[i],
                         name=team_data['name'],
                         league_id=epl_league['id'],
                         country="England",
                         alternative_names=[team_data['name']],
-                        external_ids={"demo": f"team_{len(team_ids)}"}
+                        external_ids={"demo": f"team_{i}"},
+                        created_at=now,
+                        updated_at=now
                     )
-                    result = await self.db.teams.insert_one(team.dict())
-                    team_ids.append(team.id)
-                else:
-                    team_ids.append(existing_team['id'])
+                    new_teams.append(team.model_dump())
+                    ids_by_name[team.name] = team.id
+            
+            if new_teams:
+                await self.db.teams.insert_many(new_teams)
+            
+            team_ids = [ids_by_name[team_data['name']] for team_data in epl_teams]
             
             # Son 5 hafta ve gelecek 2 hafta maçları oluştur
             await self._create_realistic_matches(epl_league['id'], team_ids)
             
-            # Takım istatistikleri oluştur
-            await self._create_team_statistics(epl_league['id'], team_ids)
-            
-            # Tahminler oluştur
-            await self._create_realistic_predictions(epl_league['id'], team_ids)
+            # Takım istatistikleri ve tahminler birbirinden bağımsız, paralel oluştur
+            await asyncio.gather(
+                self._create_team_statistics(epl_league['id'], team_ids),
+                self._create_realistic_predictions(epl_league['id'], team_ids)
+            )
             
             logger.info("✅ Demo verisi başarıyla oluşturuldu!")
             
@@ -85,259 +334,139 @@ class EnhancedDataCollector:
     
     async def _create_realistic_matches(self, league_id: str, team_ids: List[str]):
         """Gerçekçi maçlar oluştur"""
-        try:
-            # Son 5 hafta (tamamlanmış maçlar)
-            for week in range(-5, 0):
-                match_date = datetime.utcnow() + timedelta(weeks=week)
-                
-                # Her hafta 10 maç
-                for i in range(0, len(team_ids), 2):
-                    if i + 1 < len(team_ids):
-                        home_team = team_ids[i]
-                        away_team = team_ids[i + 1]
-                        
-                        # Gerçekçi skor üret
-                        home_score = random.choices([0, 1, 2, 3, 4], weights=[10, 30, 35, 20, 5])[0]
-                        away_score = random.choices([0, 1, 2, 3, 4], weights=[15, 35, 30, 15, 5])[0]
-                        
-                        # xG değerleri
-                        home_xg = round(random.uniform(0.5, 3.5), 2)
-                        away_xg = round(random.uniform(0.5, 3.5), 2)
-                        
-                        from models.database_models import Match
-                        match = Match(
-                            league_id=league_id,
-                            home_team_id=home_team,
-                            away_team_id=away_team,
-                            match_date=match_date,
-                            season="2024-25",
-                            gameweek=week + 6,
-                            home_score=home_score,
-                            away_score=away_score,
-                            home_xg=home_xg,
-                            away_xg=away_xg,
-                            home_shots=random.randint(8, 20),
-                            away_shots=random.randint(6, 18),
-                            home_shots_on_target=random.randint(3, 8),
-                            away_shots_on_target=random.randint(2, 7),
-                            home_corners=random.randint(2, 12),
-                            away_corners=random.randint(2, 10),
-                            home_yellow_cards=random.randint(0, 4),
-                            away_yellow_cards=random.randint(0, 4),
-                            home_red_cards=random.randint(0, 1),
-                            away_red_cards=random.randint(0, 1),
-                            status="finished",
-                            odds_1x2={"1": round(random.uniform(1.5, 4.5), 2), 
-                                     "X": round(random.uniform(2.8, 4.2), 2), 
-                                     "2": round(random.uniform(1.8, 5.0), 2)},
-                            odds_over_under={"over": round(random.uniform(1.7, 2.3), 2), 
-                                           "under": round(random.uniform(1.7, 2.3), 2)},
-                            odds_btts={"yes": round(random.uniform(1.6, 2.2), 2), 
-                                      "no": round(random.uniform(1.6, 2.2), 2)}
-                        )
-                        
-                        existing_match = await self.db.matches.find_one({
-                            "home_team_id": home_team,
-                            "away_team_id": away_team,
-                            "match_date": match_date
-                        })
-                        
-                        if not existing_match:
-                            await self.db.matches.insert_one(match.dict())
-            
-            # Gelecek 2 hafta (planlanmış maçlar)
-            for week in range(1, 3):
-                match_date = datetime.utcnow() + timedelta(weeks=week)
-                
-                # Her hafta 10 maç
-                for i in range(0, len(team_ids), 2):
-                    if i + 1 < len(team_ids):
-                        home_team = team_ids[i]
-                        away_team = team_ids[i + 1]
-                        
-                        from models.database_models import Match
-                        match = Match(
-                            league_id=league_id,
-                            home_team_id=home_team,
-                            away_team_id=away_team,
-                            match_date=match_date,
-                            season="2024-25",
-                            gameweek=week + 5,
-                            status="scheduled",
-                            odds_1x2={"1": round(random.uniform(1.5, 4.5), 2), 
-                                     "X": round(random.uniform(2.8, 4.2), 2), 
-                                     "2": round(random.uniform(1.8, 5.0), 2)},
-                            odds_over_under={"over": round(random.uniform(1.7, 2.3), 2), 
-                                           "under": round(random.uniform(1.7, 2.3), 2)},
-                            odds_btts={"yes": round(random.uniform(1.6, 2.2), 2), 
-                                      "no": round(random.uniform(1.6, 2.2), 2)}
-                        )
-                        
-                        existing_match = await self.db.matches.find_one({
-                            "home_team_id": home_team,
-                            "away_team_id": away_team,
-                            "match_date": match_date
-                        })
-                        
-                        if not existing_match:
-                            await self.db.matches.insert_one(match.dict())
-                            
-        except Exception as e:
-            logger.error(f"Maç oluşturma hatası: {e}")
+        now = datetime.utcnow()
+        
+        # Mevcut maçları tek sorguda al (maç başına find_one yerine)
+        existing = await self.db.matches.find(
+            {"league_id": league_id},
+            {"home_team_id": 1, "away_team_id": 1, "match_date": 1}
+        ).to_list(None)
+        seen = {(m["home_team_id"], m["away_team_id"], m["match_date"]) for m in existing}
+        to_insert = []
+        
+        # 5 geçmiş + 2 gelecek hafta için fikstür bir kez hesaplanır
+        rng = np.random.default_rng()
+        rounds = _round_robin(team_ids, 7)
+        match_docs = chain(
+            _iter_match_docs(league_id, range(-5, 0), rounds[:5], "finished", rng, now, first_gameweek=1),
+            _iter_match_docs(league_id, range(1, 3), rounds[5:], "scheduled", rng, now, first_gameweek=6)
+        )
+        
+        for doc in match_docs:
+            key = (doc["home_team_id"], doc["away_team_id"], doc["match_date"])
+            if key not in seen:
+                seen.add(key)
+                to_insert.append(doc)
+        
+        # Tüm maçları tek seferde yaz
+        if to_insert:
+            try:
+                await self.db.matches.insert_many(to_insert, ordered=False)
+            except BulkWriteError as bwe:
+                log_duplicate_write_errors("Maç", bwe)
     
     async def _create_team_statistics(self, league_id: str, team_ids: List[str]):
         """Takım istatistikleri oluştur"""
-        try:
-            for team_id in team_ids:
-                # Takımın maçlarını al
-                team_matches = await self.db.matches.find({
-                    "$or": [{"home_team_id": team_id}, {"away_team_id": team_id}],
-                    "status": "finished"
-                }).to_list(1000)
-                
-                if not team_matches:
+        # Tüm takımların istatistiklerini tek aggregation ile sunucuda hesapla
+        rows = await self.db.matches.aggregate(_team_stats_pipeline(team_ids)).to_list(None)
+        
+        ops = []
+        ids = generate_ids(len(rows))
+        now = datetime.utcnow()
+        for i, stats in enumerate(rows):
+            team_id = stats.pop("_id")
+            
+            team_stats = TeamStats(
+                id=ids[i],
+                team_id=team_id,
+                league_id=league_id,
+                season="2024-25",
+                updated_at=now,
+                **stats
+            )
+            
+            # Varsa güncelle, yoksa ekle (tek bulk_write içinde)
+            ops.append(UpdateOne(
+                {"team_id": team_id, "season": "2024-25"},
+                {"$set": team_stats.model_dump()},
+                upsert=True
+            ))
+        
+        if ops:
+            try:
+                await self.db.team_stats.bulk_write(ops, ordered=False)
+            except BulkWriteError as bwe:
+                log_duplicate_write_errors("Takım istatistiği", bwe)
+    
+    async def _create_realistic_predictions(self, league_id: str, team_ids: List[str]):
+        """Gerçekçi tahminler oluştur"""
+        now = datetime.utcnow()
+        
+        # Gelecek maçları al
+        upcoming_matches = await self.db.matches.find({
+            "league_id": league_id,
+            "status": "scheduled",
+            "match_date": {"$gte": now}
+        }).to_list(100)
+        
+        bet_types = ["1X2", "O/U2.5", "BTTS"]
+        
+        # Mevcut tahminleri tek sorguda al
+        existing = await self.db.predictions.find(
+            {"match_id": {"$in": [m['id'] for m in upcoming_matches]}},
+            {"match_id": 1, "bet_type": 1}
+        ).to_list(None)
+        seen = {(p["match_id"], p["bet_type"]) for p in existing}
+        to_insert = []
+        
+        # Sonuç ve güven değerlerini bahis tipi başına tek çağrıda üret
+        rng = np.random.default_rng()
+        n = len(upcoming_matches)
+        outcomes_1x2 = rng.choice(["1", "X", "2"], size=n, p=[0.4, 0.3, 0.3]).tolist()  # Home bias
+        outcomes_ou = rng.choice(["Over 2.5", "Under 2.5"], size=n).tolist()
+        outcomes_btts = rng.choice(["Yes", "No"], size=n).tolist()
+        confidence_1x2 = rng.uniform(60, 85, n).tolist()
+        confidence_ou = rng.uniform(55, 80, n).tolist()
+        confidence_btts = rng.uniform(50, 75, n).tolist()
+        ids = iter(generate_ids(n * len(bet_types)))
+        
+        for k, match in enumerate(upcoming_matches):
+            for bet_type in bet_types:
+                if (match['id'], bet_type) in seen:
                     continue
                 
-                # İstatistikleri hesapla
-                stats = {
-                    "matches_played": 0, "wins": 0, "draws": 0, "losses": 0,
-                    "goals_for": 0, "goals_against": 0,
-                    "home_matches_played": 0, "home_wins": 0, "home_draws": 0, "home_losses": 0,
-                    "home_goals_for": 0, "home_goals_against": 0,
-                    "away_matches_played": 0, "away_wins": 0, "away_draws": 0, "away_losses": 0,
-                    "away_goals_for": 0, "away_goals_against": 0,
-                    "clean_sheets": 0, "last_5_form": []
-                }
-                
-                for match in team_matches:
-                    is_home = match['home_team_id'] == team_id
-                    our_score = match.get('home_score', 0) if is_home else match.get('away_score', 0)
-                    opp_score = match.get('away_score', 0) if is_home else match.get('home_score', 0)
-                    
-                    stats["matches_played"] += 1
-                    stats["goals_for"] += our_score
-                    stats["goals_against"] += opp_score
+                # Gerçekçi tahmin oluştur
+                if bet_type == "1X2":
+                    predicted_outcome = outcomes_1x2[k]
+                    confidence = confidence_1x2[k]
                     
-                    if is_home:
-                        stats["home_matches_played"] += 1
-                        stats["home_goals_for"] += our_score
-                        stats["home_goals_against"] += opp_score
-                    else:
-                        stats["away_matches_played"] += 1
-                        stats["away_goals_for"] += our_score
-                        stats["away_goals_against"] += opp_score
+                elif bet_type == "O/U2.5":
+                    predicted_outcome = outcomes_ou[k]
+                    confidence = confidence_ou[k]
                     
-                    # Sonuç
-                    if our_score > opp_score:
-                        stats["wins"] += 1
-                        if is_home: stats["home_wins"] += 1
-                        else: stats["away_wins"] += 1
-                        stats["last_5_form"].append("W")
-                    elif our_score == opp_score:
-                        stats["draws"] += 1
-                        if is_home: stats["home_draws"] += 1
-                        else: stats["away_draws"] += 1
-                        stats["last_5_form"].append("D")
-                    else:
-                        stats["losses"] += 1
-                        if is_home: stats["home_losses"] += 1
-                        else: stats["away_losses"] += 1
-                        stats["last_5_form"].append("L")
-                    
-                    if opp_score == 0:
-                        stats["clean_sheets"] += 1
-                
-                # Son 5 maç formunu sınırla
-                stats["last_5_form"] = stats["last_5_form"][-5:]
-                
-                # Ortalamalar
-                if stats["matches_played"] > 0:
-                    stats["avg_goals_for"] = round(stats["goals_for"] / stats["matches_played"], 2)
-                    stats["avg_goals_against"] = round(stats["goals_against"] / stats["matches_played"], 2)
+                else:  # BTTS
+                    predicted_outcome = outcomes_btts[k]
+                    confidence = confidence_btts[k]
                 
-                from models.database_models import TeamStats
-                team_stats = TeamStats(
-                    team_id=team_id,
+                prediction = Prediction(
+                    id=next(ids),
+                    match_id=match['id'],
                     league_id=league_id,
-                    season="2024-25",
-                    **stats
+                    home_team_id=match['home_team_id'],
+                    away_team_id=match['away_team_id'],
+                    match_date=match['match_date'],
+                    bet_type=bet_type,
+                    predicted_outcome=predicted_outcome,
+                    confidence=round(confidence, 1),
+                    probability=round(confidence / 100, 3),
+                    model_version="Enhanced_v1.0",
+                    model_features={"demo": True, "enhanced": True},
+                    created_at=now
                 )
-                
-                # Mevcut istatistik var mı kontrol et
-                existing_stats = await self.db.team_stats.find_one({
-                    "team_id": team_id,
-                    "season": "2024-25"
-                })
-                
-                if existing_stats:
-                    await self.db.team_stats.update_one(
-                        {"_id": existing_stats["_id"]},
-                        {"$set": team_stats.dict()}
-                    )
-                else:
-                    await self.db.team_stats.insert_one(team_stats.dict())
-                    
-        except Exception as e:
-            logger.error(f"Takım istatistikleri oluşturma hatası: {e}")
-    
-    async def _create_realistic_predictions(self, league_id: str, team_ids: List[str]):
-        """Gerçekçi tahminler oluştur"""
-        try:
-            # Gelecek maçları al
-            upcoming_matches = await self.db.matches.find({
-                "league_id": league_id,
-                "status": "scheduled",
-                "match_date": {"$gte": datetime.utcnow()}
-            }).to_list(100)
-            
-            bet_types = ["1X2", "O/U2.5", "BTTS"]
-            
-            for match in upcoming_matches:
-                for bet_type in bet_types:
-                    # Gerçekçi tahmin oluştur
-                    if bet_type == "1X2":
-                        outcomes = ["1", "X", "2"]
-                        probabilities = [0.4, 0.3, 0.3]  # Home bias
-                        predicted_outcome = random.choices(outcomes, weights=probabilities)[0]
-                        confidence = random.uniform(60, 85)
-                        
-                    elif bet_type == "O/U2.5":
-                        outcomes = ["Over 2.5", "Under 2.5"]
-                        predicted_outcome = random.choice(outcomes)
-                        confidence = random.uniform(55, 80)
-                        
-                    else:  # BTTS
-                        outcomes = ["Yes", "No"]
-                        predicted_outcome = random.choice(outcomes)
-                        confidence = random.uniform(50, 75)
-                    
-                    # Takım isimlerini al
-                    home_team = await self.db.teams.find_one({"id": match['home_team_id']})
-                    away_team = await self.db.teams.find_one({"id": match['away_team_id']})
-                    
-                    from models.database_models import Prediction
-                    prediction = Prediction(
-                        match_id=match['id'],
-                        league_id=league_id,
-                        home_team_id=match['home_team_id'],
-                        away_team_id=match['away_team_id'],
-                        match_date=match['match_date'],
-                        bet_type=bet_type,
-                        predicted_outcome=predicted_outcome,
-                        confidence=round(confidence, 1),
-                        probability=round(confidence / 100, 3),
-                        model_version="Enhanced_v1.0",
-                        model_features={"demo": True, "enhanced": True}
-                    )
-                    
-                    # Mevcut tahmin var mı kontrol et
-                    existing_prediction = await self.db.predictions.find_one({
-                        "match_id": match['id'],
-                        "bet_type": bet_type
-                    })
-                    
-                    if not existing_prediction:
-                        await self.db.predictions.insert_one(prediction.dict())
-                        
-        except Exception as e:
-            logger.error(f"Tahmin oluşturma hatası: {e}")
\ No newline at end of file
+                to_insert.append(prediction.model_dump())
+        
+        if to_insert:
+            try:
+                await self.db.predictions.insert_many(to_insert, ordered=False)
+            except BulkWriteError as bwe:
+                log_duplicate_write_errors("Tahmin", bwe)
\ No newline at end of file
@@ -1,9 +1,15 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import os
 import uuid
 from enum import Enum
 
+def generate_ids(n: int) -> List[str]:
+    """Toplu kayıt oluşturma için tek os.urandom çağrısıyla n adet UUID4 üret"""
+    buf = os.urandom(16 * n)
+    return [str(uuid.UUID(bytes=buf[i * 16:(i + 1) * 16], version=4)) for i in range(n)]
+
 class MatchResult(str, Enum):
     HOME_WIN = "1"
     DRAW = "X"
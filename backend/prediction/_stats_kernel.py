@@ -0,0 +1,163 @@
+"""Toplu takım ve H2H istatistiği hesaplama çekirdekleri
+
+Tamamlanmış maç tablosu tarih sırasına göre NumPy dizilerine alınır; her
+(takım, tarih, venue) ya da (takım, takım, tarih) sorgusu için o tarihten
+önceki son `window` maçın istatistikleri tek geçişte hesaplanır. numba
+kuruluysa çekirdekler JIT ile derlenir ve sorgular paralel işlenir.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# compute_rolling çıktısındaki kolon sırası
+STAT_KEYS = (
+    'games_played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+    'goals_avg', 'goals_against_avg', 'clean_sheets', 'btts_count',
+    'over_2_5_count', 'form_points'
+)
+FLOAT_STATS = ('goals_avg', 'goals_against_avg')
+# compute_h2h çıktısındaki kolon sırası
+H2H_KEYS = ('h2h_games', 'h2h_wins', 'h2h_draws', 'h2h_losses')
+
+VENUE_ALL = 0
+VENUE_HOME = 1
+VENUE_AWAY = 2
+VENUE_CODES = {'all': VENUE_ALL, 'home': VENUE_HOME, 'away': VENUE_AWAY}
+
+
+@njit(parallel=True, cache=True)
+def compute_rolling(home_ids, away_ids, home_scores, away_scores, dates,
+                    query_team_ids, query_dates, query_venues, window):
+    """Her sorgu için son `window` maçın istatistikleri -> (sorgu, len(STAT_KEYS))
+
+    `dates` artan sıralı olmalı; sorgu tarihinden önceki (<) maçlar sayılır.
+    """
+    n_queries = query_team_ids.shape[0]
+    out = np.zeros((n_queries, 12), dtype=np.float64)
+
+    for q in prange(n_queries):
+        team = query_team_ids[q]
+        venue = query_venues[q]
+        i = np.searchsorted(dates, query_dates[q]) - 1
+
+        games = 0
+        wins = 0
+        draws = 0
+        goals_for = 0
+        goals_against = 0
+        clean_sheets = 0
+        btts = 0
+        over_2_5 = 0
+
+        while i >= 0 and games < window:
+            is_home = home_ids[i] == team
+            is_away = away_ids[i] == team
+
+            if (venue == VENUE_HOME and is_home) or (venue == VENUE_AWAY and is_away) or \
+                    (venue == VENUE_ALL and (is_home or is_away)):
+                if is_home:
+                    our = home_scores[i]
+                    opp = away_scores[i]
+                else:
+                    our = away_scores[i]
+                    opp = home_scores[i]
+
+                games += 1
+                goals_for += our
+                goals_against += opp
+                if our > opp:
+                    wins += 1
+                elif our == opp:
+                    draws += 1
+                if opp == 0:
+                    clean_sheets += 1
+                if our > 0 and opp > 0:
+                    btts += 1
+                if our + opp > 2:
+                    over_2_5 += 1
+
+            i -= 1
+
+        if games > 0:
+            out[q, 0] = games
+            out[q, 1] = wins
+            out[q, 2] = draws
+            out[q, 3] = games - wins - draws
+            out[q, 4] = goals_for
+            out[q, 5] = goals_against
+            out[q, 6] = goals_for / games
+            out[q, 7] = goals_against / games
+            out[q, 8] = clean_sheets
+            out[q, 9] = btts
+            out[q, 10] = over_2_5
+            out[q, 11] = wins * 3 + draws
+
+    return out
+
+
+@njit(parallel=True, cache=True)
+def compute_h2h(home_ids, away_ids, home_scores, away_scores, dates,
+                query_first_ids, query_second_ids, query_dates, window):
+    """Her sorgu için iki takımın son `window` karşılaşması -> (sorgu, len(H2H_KEYS))
+
+    Galibiyet/mağlubiyet ilk takım açısındandır.
+    """
+    n_queries = query_first_ids.shape[0]
+    out = np.zeros((n_queries, 4), dtype=np.int64)
+
+    for q in prange(n_queries):
+        first = query_first_ids[q]
+        second = query_second_ids[q]
+        i = np.searchsorted(dates, query_dates[q]) - 1
+
+        games = 0
+        wins = 0
+        draws = 0
+
+        while i >= 0 and games < window:
+            if home_ids[i] == first and away_ids[i] == second:
+                our = home_scores[i]
+                opp = away_scores[i]
+            elif home_ids[i] == second and away_ids[i] == first:
+                our = away_scores[i]
+                opp = home_scores[i]
+            else:
+                i -= 1
+                continue
+
+            games += 1
+            if our > opp:
+                wins += 1
+            elif our == opp:
+                draws += 1
+            i -= 1
+
+        out[q, 0] = games
+        out[q, 1] = wins
+        out[q, 2] = draws
+        out[q, 3] = games - wins - draws
+
+    return out
+
+
+def row_to_stats(row) -> dict:
+    """compute_rolling satırını _get_team_recent_stats sözlüğüne çevir"""
+    return {
+        key: float(value) if key in FLOAT_STATS else int(value)
+        for key, value in zip(STAT_KEYS, row)
+    }
+
+
+def row_to_h2h(row) -> dict:
+    """compute_h2h satırını _get_h2h_stats sözlüğüne çevir"""
+    return {key: int(value) for key, value in zip(H2H_KEYS, row)}
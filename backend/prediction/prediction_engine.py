@@ -4,48 +4,233 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+
+# Intel CPU'larda scikit-learn'ü oneDAL hızlandırmalı sürümle yamala (opsiyonel)
+try:
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+except ImportError:
+    pass
+
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
+from collections import OrderedDict
 from pathlib import Path
 from xgboost import XGBClassifier
+from pymongo import UpdateOne
 
 from models.database_models import Match, Prediction, TeamStats, BetType, MatchResult
+from prediction._stats_kernel import VENUE_CODES, compute_h2h, compute_rolling, row_to_h2h, row_to_stats
 
 logger = logging.getLogger(__name__)
 
+# Eğitim verisine giren tamamlanmış maçlar
+TRAINING_MATCH_FILTER = {
+    "status": "finished",
+    "home_score": {"$exists": True},
+    "away_score": {"$exists": True}
+}
+# İstatistik sorgularında yalnızca skor alanları okunur
+SCORE_PROJECTION = {"_id": 0, "home_team_id": 1, "away_team_id": 1, "home_score": 1, "away_score": 1}
+# Tahmin için gereken maç alanları
+SCHEDULED_MATCH_PROJECTION = {"_id": 0, "id": 1, "league_id": 1, "home_team_id": 1, "away_team_id": 1, "match_date": 1}
+TEAM_STATS_WINDOW = 10  # Takım başına son N maç
+H2H_WINDOW = 5  # Son N karşılaşma
+STATS_CACHE_SIZE = 10_000
+FEATURE_CONCURRENCY = 50  # Tahmin sırasında aynı anda feature oluşturulan maç sayısı
+# Kayıtlı scaler dosyasının biçimi; eşleşmeyen (eski) dosyalar yüklenmez, model yeniden eğitilir
+MODEL_FORMAT_VERSION = 3
+# Takım/lig id'lerinin tamsayı kodlu feature'ları; eğitimde görülmemiş id'ler UNKNOWN_CODE alır
+ID_FEATURES = ('home_team_id', 'away_team_id', 'league_id')
+UNKNOWN_CODE = -1
+
+
+def _venue_window_output(prefix: str, our: str, opp: str, win: int) -> Dict[str, Any]:
+    """Bir takımın önceki TEAM_STATS_WINDOW maçı için $setWindowFields çıktıları"""
+    window = {"documents": [-TEAM_STATS_WINDOW, -1]}  # Mevcut maç hariç
+    won = {"$eq": ["$_r", win]}
+    drawn = {"$eq": ["$_r", 0]}
+    lost = {"$eq": ["$_r", -win]}
+    
+    return {
+        f"{prefix}games_played": {"$sum": 1, "window": window},
+        f"{prefix}wins": {"$sum": {"$cond": [won, 1, 0]}, "window": window},
+        f"{prefix}draws": {"$sum": {"$cond": [drawn, 1, 0]}, "window": window},
+        f"{prefix}losses": {"$sum": {"$cond": [lost, 1, 0]}, "window": window},
+        f"{prefix}goals_for": {"$sum": our, "window": window},
+        f"{prefix}goals_against": {"$sum": opp, "window": window},
+        f"{prefix}clean_sheets": {"$sum": {"$cond": [{"$eq": [opp, 0]}, 1, 0]}, "window": window},
+        f"{prefix}btts_count": {
+            "$sum": {"$cond": [{"$and": [{"$gt": [our, 0]}, {"$gt": [opp, 0]}]}, 1, 0]},
+            "window": window
+        },
+        f"{prefix}over_2_5_count": {
+            "$sum": {"$cond": [{"$gt": [{"$add": [our, opp]}, 2.5]}, 1, 0]},
+            "window": window
+        },
+        f"{prefix}form_points": {
+            "$sum": {"$cond": [won, 3, {"$cond": [drawn, 1, 0]}]},
+            "window": window
+        }
+    }
+
+
+def _average(total: str, count: str) -> Dict[str, Any]:
+    return {"$cond": [{"$gt": [count, 0]}, {"$divide": [total, count]}, 0.0]}
+
+
+def _training_features_pipeline() -> List[Dict[str, Any]]:
+    """Tüm tamamlanmış maçlar için eğitim feature'larını üreten aggregation pipeline'ı
+    
+    Her maç için ev sahibinin önceki ev maçları, deplasman takımının önceki deplasman
+    maçları ve iki takımın önceki karşılaşmaları pencere fonksiyonlarıyla hesaplanır
+    (MongoDB 5.0+ $setWindowFields).
+    """
+    home_is_low = {"$lt": ["$home_team_id", "$away_team_id"]}
+    h2h_window = {"documents": [-H2H_WINDOW, -1]}
+    
+    return [
+        {"$match": TRAINING_MATCH_FILTER},
+        {"$set": {
+            "_hs": {"$ifNull": ["$home_score", 0]},
+            "_as": {"$ifNull": ["$away_score", 0]}
+        }},
+        {"$set": {
+            # 1: ev sahibi kazandı, 0: beraberlik, -1: deplasman kazandı
+            "_r": {"$cmp": ["$_hs", "$_as"]},
+            # Takım çifti, ev/deplasmandan bağımsız
+            "_pair": {"$cond": [
+                home_is_low,
+                {"$concat": ["$home_team_id", "|", "$away_team_id"]},
+                {"$concat": ["$away_team_id", "|", "$home_team_id"]}
+            ]}
+        }},
+        # Sonucu çiftin ilk (küçük id'li) takımı açısından ifade et
+        {"$set": {"_low_r": {"$cond": [home_is_low, "$_r", {"$multiply": ["$_r", -1]}]}}},
+        {"$setWindowFields": {
+            "partitionBy": "$home_team_id",
+            "sortBy": {"match_date": 1},
+            "output": _venue_window_output("home_", "$_hs", "$_as", 1)
+        }},
+        {"$setWindowFields": {
+            "partitionBy": "$away_team_id",
+            "sortBy": {"match_date": 1},
+            "output": _venue_window_output("away_", "$_as", "$_hs", -1)
+        }},
+        {"$setWindowFields": {
+            "partitionBy": "$_pair",
+            "sortBy": {"match_date": 1},
+            "output": {
+                "h2h_h2h_games": {"$sum": 1, "window": h2h_window},
+                "_h2h_low_wins": {"$sum": {"$cond": [{"$eq": ["$_low_r", 1]}, 1, 0]}, "window": h2h_window},
+                "h2h_h2h_draws": {"$sum": {"$cond": [{"$eq": ["$_low_r", 0]}, 1, 0]}, "window": h2h_window},
+                "_h2h_high_wins": {"$sum": {"$cond": [{"$eq": ["$_low_r", -1]}, 1, 0]}, "window": h2h_window}
+            }
+        }},
+        {"$set": {
+            "home_goals_avg": _average("$home_goals_for", "$home_games_played"),
+            "home_goals_against_avg": _average("$home_goals_against", "$home_games_played"),
+            "away_goals_avg": _average("$away_goals_for", "$away_games_played"),
+            "away_goals_against_avg": _average("$away_goals_against", "$away_games_played"),
+            # H2H ev sahibi takım açısından
+            "h2h_h2h_wins": {"$cond": [home_is_low, "$_h2h_low_wins", "$_h2h_high_wins"]},
+            "h2h_h2h_losses": {"$cond": [home_is_low, "$_h2h_high_wins", "$_h2h_low_wins"]},
+            # Zaman bazlı özellikler (day_of_week: Pazartesi=0, datetime.weekday() ile aynı)
+            "month": {"$month": "$match_date"},
+            "day_of_week": {"$subtract": [{"$isoDayOfWeek": "$match_date"}, 1]},
+            "is_weekend": {"$cond": [{"$gte": [{"$isoDayOfWeek": "$match_date"}, 6]}, 1, 0]}
+        }},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            **{f"{venue}_{key}": 1 for venue in ("home", "away") for key in (
+                'games_played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+                'goals_avg', 'goals_against_avg', 'clean_sheets', 'btts_count',
+                'over_2_5_count', 'form_points'
+            )},
+            "h2h_h2h_games": 1,
+            "h2h_h2h_wins": 1,
+            "h2h_h2h_draws": 1,
+            "h2h_h2h_losses": 1,
+            "month": 1,
+            "day_of_week": 1,
+            "is_weekend": 1
+        }}
+    ]
+
+
+def _date_bucket(match_date) -> str:
+    """Önbellek anahtarı için maç günü"""
+    if isinstance(match_date, datetime):
+        return match_date.date().isoformat()
+    return str(match_date)[:10]
+
+
+def _dump_atomic(obj, path: Path, **kwargs):
+    """Geçici dosyaya yazıp yerine taşı; dosyaları okuyan diğer süreç yarım dosya görmez"""
+    tmp_path = path.with_suffix(".tmp")
+    joblib.dump(obj, tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
 class PredictionEngine:
-    def __init__(self, db):
+    def __init__(self, db, train_in_process: bool = True):
         self.db = db
         self.models = {}
         self.scalers = {}
+        # False: eksik modeller bu süreçte eğitilmez, kuyruktaki eğitim işi (worker) oluşturur
+        self.train_in_process = train_in_process
+        # Yüklü modellerin dosya değişiklik zamanları; başka süreç yeniden eğitince değişir
+        self._loaded_signature: Optional[Tuple] = None
+        # bet_type -> {feature adı: kolon sırası} (eğitim matrisinin kolonları)
+        self._feature_index: Dict[str, Dict[str, int]] = {}
+        # Sınıf indeksi -> tahmin etiketi
+        self._outcome_tables = {
+            '1X2': np.array(['X', '1', '2'], dtype=object),  # Draw, Home win, Away win
+            'O/U2.5': np.array(['Under 2.5', 'Over 2.5'], dtype=object),
+            'BTTS': np.array(['No', 'Yes'], dtype=object)
+        }
+        # Takım/lig id'leri -> tamsayı feature (modellerle birlikte saklanır)
+        self._team_vocab: Dict[str, int] = {}
+        self._league_vocab: Dict[str, int] = {}
         self.models_path = Path(__file__).parent / "models"
         self.models_path.mkdir(exist_ok=True)
         
+        # (tür, takım(lar), venue, gün) -> istatistik; LRU
+        self._stats_cache: OrderedDict = OrderedDict()
+        
         # Model konfigürasyonu
         self.model_configs = {
             '1X2': {
                 'model_class': XGBClassifier,
                 'params': {
-                    'n_estimators': 100,
+                    'n_estimators': 200,
                     'max_depth': 6,
                     'learning_rate': 0.1,
+                    'tree_method': 'hist',
+                    'objective': 'multi:softprob',
+                    'n_jobs': -1,
                     'random_state': 42
                 },
-                'target_column': 'result'
+                'target_column': 'result',
+                'needs_scaling': False
             },
             'O/U2.5': {
-                'model_class': RandomForestClassifier,
+                'model_class': XGBClassifier,
                 'params': {
-                    'n_estimators': 100,
-                    'max_depth': 8,
+                    'n_estimators': 200,
+                    'max_depth': 6,
+                    'learning_rate': 0.1,
+                    'tree_method': 'hist',
+                    'n_jobs': -1,
                     'random_state': 42
                 },
-                'target_column': 'over_under_2_5'
+                'target_column': 'over_under_2_5',
+                'needs_scaling': False
             },
             'BTTS': {
                 'model_class': LogisticRegression,
@@ -53,28 +238,153 @@ class PredictionEngine:
                     'random_state': 42,
                     'max_iter': 1000
                 },
-                'target_column': 'both_teams_score'
+                'target_column': 'both_teams_score',
+                'needs_scaling': True,
+                # Sıra kodu doğrusal modelde anlamsız: lig one-hot, takım id'leri (gücü form
+                # özellikleri taşır, one-hot'ları binlerce kolon olurdu) modele girmez
+                'one_hot_features': ('league_id',),
+                'excluded_features': ('home_team_id', 'away_team_id')
             }
         }
     
-    async def initialize_models(self):
-        """Modelleri başlat veya yükle"""
+    async def ensure_indexes(self):
+        """Feature sorgularının (takım + durum + tarih, son N maç) kullandığı index'leri oluştur"""
         try:
-            for bet_type in self.model_configs.keys():
-                model_file = self.models_path / f"{bet_type}_model.pkl"
-                scaler_file = self.models_path / f"{bet_type}_scaler.pkl"
+            await self.db.matches.create_index([("home_team_id", 1), ("status", 1), ("match_date", -1)])
+            await self.db.matches.create_index([("away_team_id", 1), ("status", 1), ("match_date", -1)])
+            # H2H sorgusu (home_team_id, away_team_id, match_date) unique index'ini kullanır
+            await self.db.predictions.create_index([("match_id", 1), ("bet_type", 1)], unique=True)
+            # /stats/performance created_at aralığını tarar, is_correct ile doğruları sayar
+            await self.db.predictions.create_index([("created_at", 1), ("is_correct", 1)])
+            
+        except Exception as e:
+            logger.error(f"Tahmin index oluşturma hatası: {e}")
+    
+    def _index_features(self, bet_type: str, feature_names: List[str]):
+        """Feature adlarını eğitimdeki kolon sıralarına eşle"""
+        self._feature_index[bet_type] = {name: i for i, name in enumerate(feature_names)}
+    
+    def _vocab_file(self) -> Path:
+        return self.models_path / "id_vocab.pkl"
+    
+    def _load_vocab(self):
+        """Kayıtlı takım/lig sözlüğünü yükle"""
+        vocab_file = self._vocab_file()
+        if not self._team_vocab and vocab_file.exists():
+            vocab = joblib.load(vocab_file)
+            self._team_vocab = vocab['teams']
+            self._league_vocab = vocab['leagues']
+    
+    def _save_vocab(self):
+        """Takım/lig sözlüğünü modellerin yanına kaydet"""
+        _dump_atomic({'teams': self._team_vocab, 'leagues': self._league_vocab}, self._vocab_file())
+    
+    def _extend_vocab(self, df: pd.DataFrame):
+        """Eğitim verisindeki yeni takım/lig id'lerine sıradaki kodu ver (mevcut kodlar korunur)"""
+        for team_id in pd.unique(pd.concat([df['home_team_id'], df['away_team_id']])):
+            self._team_vocab.setdefault(team_id, len(self._team_vocab))
+        for league_id in pd.unique(df['league_id']):
+            self._league_vocab.setdefault(league_id, len(self._league_vocab))
+    
+    def _team_code(self, team_id: str) -> int:
+        """Takım id'sinin tamsayı kodu (sözlükte yoksa UNKNOWN_CODE)"""
+        return self._team_vocab.get(team_id, UNKNOWN_CODE)
+    
+    def _league_code(self, league_id: str) -> int:
+        """Lig id'sinin tamsayı kodu (sözlükte yoksa UNKNOWN_CODE)"""
+        return self._league_vocab.get(league_id, UNKNOWN_CODE)
+    
+    def _encode_ids(self, X: pd.DataFrame, bet_type: str) -> pd.DataFrame:
+        """Model tipine göre id kolonlarını çıkar ya da one-hot ('league_id=3') kolonlara aç"""
+        config = self.model_configs[bet_type]
+        X = X.drop(columns=list(config.get('excluded_features', ())))
+        
+        for name in config.get('one_hot_features', ()):
+            codes = X.pop(name).astype(np.int64)
+            X = pd.concat([X, pd.get_dummies(codes, prefix=name, prefix_sep='=', dtype=np.float32)], axis=1)
+        
+        return X
+    
+    def _model_file(self, bet_type: str, kind: str) -> Path:
+        """Model/scaler dosya yolu ('O/U2.5' gibi isimlerdeki '/' dizin ayırıcısı olmasın)"""
+        return self.models_path / f"{bet_type.replace('/', '_')}_{kind}.pkl"
+    
+    def _files_signature(self) -> Tuple:
+        """Sözlük ve model/scaler dosyalarının değişiklik zamanları (olmayan dosya None)"""
+        paths = [self._vocab_file()] + [
+            self._model_file(bet_type, kind) for bet_type in self.model_configs for kind in ("model", "scaler")
+        ]
+        signature = []
+        for path in paths:
+            try:
+                signature.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _drop_stale_models(self):
+        """Dosyalar yüklendikten sonra değiştiyse (ör. worker'daki eğitim işi) bellekteki modelleri
+        ve sözlüğü bırak; sonraki initialize_models yenilerini yükler"""
+        if self._loaded_signature is None or self._files_signature() == self._loaded_signature:
+            return
+        
+        logger.info("Model dosyaları değişmiş, modeller yeniden yüklenecek")
+        self.models.clear()
+        self.scalers.clear()
+        self._feature_index.clear()
+        self._team_vocab = {}
+        self._league_vocab = {}
+    
+    async def initialize_models(self) -> List[str]:
+        """Modelleri başlat veya yükle -> eğitilmesi gereken (yüklenemeyen) bahis tipleri
+        
+        train_in_process False ise eksik modeller eğitilmez, liste olarak döner.
+        """
+        # Bellekte olan modeller tekrar yüklenmez
+        missing = [bet_type for bet_type in self.model_configs.keys() if bet_type not in self.models]
+        if not missing:
+            return []
+        
+        try:
+            self._loaded_signature = self._files_signature()
+            # sklearnex yaması uygulandıysa estimator'lar daal4py/sklearnex modülünden gelir
+            logger.info(f"scikit-learn estimator modülü: {LogisticRegression.__module__}")
+            self._load_vocab()
+            to_train = []
+            
+            for bet_type in missing:
+                model_file = self._model_file(bet_type, "model")
+                scaler_file = self._model_file(bet_type, "scaler")
                 
-                if model_file.exists() and scaler_file.exists():
-                    # Mevcut modeli yükle
-                    self.models[bet_type] = joblib.load(model_file)
-                    self.scalers[bet_type] = joblib.load(scaler_file)
-                    logger.info(f"Model yüklendi: {bet_type}")
-                else:
-                    # Yeni model oluştur
-                    await self.train_model(bet_type)
-                    logger.info(f"Yeni model oluşturuldu: {bet_type}")
+                if not (model_file.exists() and scaler_file.exists()):
+                    to_train.append(bet_type)
+                    continue
+                
+                # Scaler + feature adları sıkıştırmasız, mmap ile
+                preprocessing = joblib.load(scaler_file, mmap_mode='r')
+                # Eski sürümlerin yalın scaler dosyası ya da farklı biçim sürümü
+                if not isinstance(preprocessing, dict) or preprocessing.get('version') != MODEL_FORMAT_VERSION:
+                    logger.warning(f"Kayıtlı model biçimi uyumsuz, yeniden eğitilecek: {bet_type}")
+                    to_train.append(bet_type)
+                    continue
+                
+                # Mevcut modeli yükle
+                self.models[bet_type] = joblib.load(model_file)
+                self.scalers[bet_type] = preprocessing['scaler']
+                self._index_features(bet_type, preprocessing['feature_names'])
+                logger.info(f"Model yüklendi: {bet_type}")
+            
+            if to_train and not self.train_in_process:
+                logger.warning(f"Model bulunamadı, eğitim işi bekleniyor: {', '.join(to_train)}")
+                return to_train
+            
+            # Yeni modeller aynı eğitim matrisinden eşzamanlı eğitilir
+            if to_train:
+                await self.train_models(to_train)
+                logger.info(f"Yeni model oluşturuldu: {', '.join(to_train)}")
             
             logger.info("Tüm tahmin modelleri hazır!")
+            return []
             
         except Exception as e:
             logger.error(f"Model başlatma hatası: {e}")
@@ -82,15 +392,37 @@ class PredictionEngine:
     
     async def train_model(self, bet_type: str):
         """Belirli bahis tipi için model eğit"""
+        await self.train_models([bet_type])
+    
+    async def train_models(self, bet_types: List[str]):
+        """Bahis tiplerini tek eğitim matrisinden eşzamanlı eğit"""
+        logger.info(f"Model eğitimi başlıyor: {', '.join(bet_types)}")
+        
+        # Sözlük kayıtlı son hâlinden genişletilir; mevcut kodlar korunur
+        self._drop_stale_models()
+        self._load_vocab()
+        
+        # Feature'lar bir kez hesaplanır; bahis tipleri yalnızca hedef kolonda ayrışır
+        X, df = await self._prepare_training_data()
+        
+        if len(X) < 100:
+            logger.warning(f"Yetersiz eğitim verisi: {len(X)} örneklem")
+            return
+        
+        self._save_vocab()
+        
+        # Eşzamanlı fit'ler çekirdekleri paylaşır; toplam iş parçacığı CPU sayısını aşmaz
+        n_jobs = max(1, (os.cpu_count() or 1) // len(bet_types))
+        await asyncio.gather(*(self._fit_model(bet_type, X, df, n_jobs) for bet_type in bet_types))
+        # Bellekteki modeller dosyalarla aynı; yeniden yükleme gerekmez
+        self._loaded_signature = self._files_signature()
+    
+    async def _fit_model(self, bet_type: str, X: pd.DataFrame, df: pd.DataFrame, n_jobs: int):
+        """Ortak feature matrisiyle bir bahis tipinin modelini eğit ve kaydet"""
         try:
-            logger.info(f"Model eğitimi başlıyor: {bet_type}")
-            
-            # Eğitim verilerini hazırla
-            X, y = await self._prepare_training_data(bet_type)
-            
-            if len(X) < 100:
-                logger.warning(f"Yetersiz eğitim verisi: {bet_type} - {len(X)} örneklem")
-                return
+            config = self.model_configs[bet_type]
+            y = await self._create_targets(df, config['target_column'])
+            X = self._encode_ids(X, bet_type)
             
             # Train-test split
             X_train, X_test, y_train, y_test = train_test_split(
@@ -98,14 +430,25 @@ class PredictionEngine:
             )
             
             # Scaler
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
+            # Satır bazlı (C-order) float32 matris: ağaç/BLAS geçişlerinde her örnek bitişik bellekte
+            feature_names = list(X.columns)
+            X_train_scaled = np.ascontiguousarray(X_train.to_numpy(dtype=np.float32))
+            X_test_scaled = np.ascontiguousarray(X_test.to_numpy(dtype=np.float32))
+            
+            # Scaler (ağaç modellerinde bölünmeleri etkilemediği için kullanılmaz)
+            scaler = None
+            if config['needs_scaling']:
+                scaler = StandardScaler()
+                X_train_scaled = np.ascontiguousarray(scaler.fit_transform(X_train_scaled), dtype=np.float32)
+                X_test_scaled = np.ascontiguousarray(scaler.transform(X_test_scaled), dtype=np.float32)
             
             # Model
-            config = self.model_configs[bet_type]
-            model = config['model_class'](**config['params'])
-            model.fit(X_train_scaled, y_train)
+            params = dict(config['params'])
+            if 'n_jobs' in params:
+                params['n_jobs'] = n_jobs
+            model = config['model_class'](**params)
+            # fit thread'de: event loop ve diğer bahis tiplerinin eğitimi beklemez
+            await asyncio.to_thread(model.fit, X_train_scaled, y_train)
             
             # Test
             y_pred = model.predict(X_test_scaled)
@@ -116,23 +459,23 @@ class PredictionEngine:
             # Modeli kaydet
             self.models[bet_type] = model
             self.scalers[bet_type] = scaler
+            self._index_features(bet_type, feature_names)
             
-            joblib.dump(model, self.models_path / f"{bet_type}_model.pkl")
-            joblib.dump(scaler, self.models_path / f"{bet_type}_scaler.pkl")
+            _dump_atomic(model, self._model_file(bet_type, "model"), compress=('lz4', 3))
+            _dump_atomic(
+                {'version': MODEL_FORMAT_VERSION, 'scaler': scaler, 'feature_names': feature_names},
+                self._model_file(bet_type, "scaler")
+            )
             
         except Exception as e:
             logger.error(f"Model eğitimi hatası ({bet_type}): {e}")
             raise e
     
-    async def _prepare_training_data(self, bet_type: str) -> Tuple[pd.DataFrame, pd.Series]:
-        """Eğitim verilerini hazırla"""
+    async def _prepare_training_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Eğitim verilerini hazırla -> (feature matrisi, hedefler için maç tablosu)"""
         try:
             # Tamamlanmış maçları al
-            matches = await self.db.matches.find({
-                "status": "finished",
-                "home_score": {"$exists": True},
-                "away_score": {"$exists": True}
-            }).to_list(10000)
+            matches = await self.db.matches.find(TRAINING_MATCH_FILTER).to_list(10000)
             
             if not matches:
                 raise ValueError("Eğitim için tamamlanmış maç bulunamadı")
@@ -143,232 +486,259 @@ class PredictionEngine:
             # Feature engineering
             features_df = await self._create_features(df)
             
-            # Target variable
-            target_col = self.model_configs[bet_type]['target_column']
-            targets = await self._create_targets(df, target_col)
-            
-            # Eksik değerleri temizle
+            # Eksik değerleri temizle, sayısal feature'ları float32'ye indir
             features_df = features_df.fillna(0)
+            numeric_columns = features_df.select_dtypes(include='number').columns
+            features_df[numeric_columns] = features_df[numeric_columns].astype(np.float32)
             
-            return features_df, targets
+            return features_df, df
             
         except Exception as e:
-            logger.error(f"Eğitim verisi hazırlama hatası ({bet_type}): {e}")
+            logger.error(f"Eğitim verisi hazırlama hatası: {e}")
             raise e
     
     async def _create_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Feature engineering"""
-        features = []
+        # Takım/H2H pencere istatistikleri ve zaman özellikleri tek aggregation ile sunucuda hesaplanır
+        rows = await self.db.matches.aggregate(_training_features_pipeline()).to_list(None)
         
-        for _, match in df.iterrows():
-            try:
-                # Temel bilgiler
-                feature_dict = {
-                    'home_team_id': match['home_team_id'],
-                    'away_team_id': match['away_team_id'],
-                    'league_id': match['league_id']
-                }
-                
-                # Takım performans verileri
-                home_stats = await self._get_team_recent_stats(
-                    match['home_team_id'], 
-                    match['match_date'], 
-                    venue='home'
-                )
-                
-                away_stats = await self._get_team_recent_stats(
-                    match['away_team_id'], 
-                    match['match_date'], 
-                    venue='away'
-                )
-                
-                # Home team features
-                for key, value in home_stats.items():
-                    feature_dict[f'home_{key}'] = value
-                
-                # Away team features
-                for key, value in away_stats.items():
-                    feature_dict[f'away_{key}'] = value
-                
-                # Head-to-head
-                h2h_stats = await self._get_h2h_stats(
-                    match['home_team_id'], 
-                    match['away_team_id'], 
-                    match['match_date']
-                )
-                
-                for key, value in h2h_stats.items():
-                    feature_dict[f'h2h_{key}'] = value
-                
-                # Zaman bazlı özellikler
-                match_date = match['match_date']
-                if isinstance(match_date, str):
-                    match_date = datetime.fromisoformat(match_date.replace('Z', '+00:00'))
-                
-                feature_dict['month'] = match_date.month
-                feature_dict['day_of_week'] = match_date.weekday()
-                feature_dict['is_weekend'] = 1 if match_date.weekday() >= 5 else 0
-                
-                features.append(feature_dict)
-                
-            except Exception as e:
-                logger.warning(f"Feature oluşturma hatası: {e}")
-                continue
+        if not rows:
+            return pd.DataFrame()
+        
+        # Temel bilgiler (tamsayı kodlu id'ler) + maç bazlı feature'lar (eğitim verisi sırasıyla)
+        self._extend_vocab(df)
+        features_df = pd.DataFrame({
+            'id': df['id'],
+            'home_team_id': df['home_team_id'].map(self._team_code),
+            'away_team_id': df['away_team_id'].map(self._team_code),
+            'league_id': df['league_id'].map(self._league_code)
+        }).merge(pd.DataFrame(rows), on='id', how='left')
         
-        return pd.DataFrame(features).fillna(0)
+        return features_df.drop(columns='id').fillna(0)
     
     async def _create_targets(self, df: pd.DataFrame, target_col: str) -> pd.Series:
         """Target değişkenlerini oluştur"""
-        targets = []
-        
-        for _, match in df.iterrows():
-            home_score = match.get('home_score', 0)
-            away_score = match.get('away_score', 0)
-            
-            if home_score is None or away_score is None:
-                targets.append(0)
-                continue
-            
-            if target_col == 'result':
-                # 1X2
-                if home_score > away_score:
-                    targets.append(1)  # Home win
-                elif home_score == away_score:
-                    targets.append(0)  # Draw
-                else:
-                    targets.append(2)  # Away win
-                    
-            elif target_col == 'over_under_2_5':
-                # Over/Under 2.5
-                total_goals = home_score + away_score
-                targets.append(1 if total_goals > 2.5 else 0)
-                
-            elif target_col == 'both_teams_score':
-                # Both teams score
-                targets.append(1 if home_score > 0 and away_score > 0 else 0)
-            
-            else:
-                targets.append(0)
+        missing = (df['home_score'].isna() | df['away_score'].isna()).to_numpy()
+        home_score = df['home_score'].fillna(0).to_numpy()
+        away_score = df['away_score'].fillna(0).to_numpy()
+        
+        if target_col == 'result':
+            # 1X2: 1 ev sahibi, 0 beraberlik, 2 deplasman
+            targets = np.where(home_score > away_score, 1, np.where(home_score == away_score, 0, 2))
+        elif target_col == 'over_under_2_5':
+            # Over/Under 2.5
+            targets = (home_score + away_score > 2.5).astype(np.int8)
+        elif target_col == 'both_teams_score':
+            # Both teams score
+            targets = ((home_score > 0) & (away_score > 0)).astype(np.int8)
+        else:
+            targets = np.zeros(len(df), dtype=np.int8)
+        
+        # Skoru eksik maçlar 0 olarak işaretlenir
+        targets[missing] = 0
         
         return pd.Series(targets)
     
-    async def _get_team_recent_stats(self, team_id: str, match_date: datetime, venue: str = 'all') -> Dict[str, float]:
-        """Takımın son maçlardaki performansını al"""
+    def _cache_get(self, key: Tuple) -> Optional[Dict[str, float]]:
+        """İstatistik önbelleğinden oku (LRU)"""
+        stats = self._stats_cache.get(key)
+        if stats is not None:
+            self._stats_cache.move_to_end(key)
+        return stats
+    
+    def _cache_put(self, key: Tuple, stats: Dict[str, float]):
+        """İstatistik önbelleğine yaz, kapasite aşılırsa en eskiyi at"""
+        self._stats_cache[key] = stats
+        self._stats_cache.move_to_end(key)
+        if len(self._stats_cache) > STATS_CACHE_SIZE:
+            self._stats_cache.popitem(last=False)
+    
+    async def _prefill_match_stats(self, matches: List[Dict[str, Any]]):
+        """Tahmin edilecek maçların takım ve H2H istatistiklerini bellekteki maç tablosundan toplu hesaplayıp önbelleğe koy"""
         try:
-            # Son 10 maçı al
-            query = {
-                "$or": [
-                    {"home_team_id": team_id},
-                    {"away_team_id": team_id}
-                ],
-                "match_date": {"$lt": match_date},
-                "status": "finished"
-            }
+            # Tamamlanmış maç tablosunu bir kez, tarih sırasıyla al
+            table = await self.db.matches.find(
+                TRAINING_MATCH_FILTER,
+                {"_id": 0, "home_team_id": 1, "away_team_id": 1, "home_score": 1, "away_score": 1, "match_date": 1}
+            ).sort("match_date", 1).to_list(None)
             
-            if venue == 'home':
-                query = {"home_team_id": team_id, "match_date": {"$lt": match_date}, "status": "finished"}
-            elif venue == 'away':
-                query = {"away_team_id": team_id, "match_date": {"$lt": match_date}, "status": "finished"}
+            if not table:
+                return
             
-            matches = await self.db.matches.find(query).sort("match_date", -1).limit(10).to_list(10)
+            n = len(table)
+            team_index: Dict[str, int] = {}
+            home_ids = np.fromiter((team_index.setdefault(m['home_team_id'], len(team_index)) for m in table), dtype=np.int32, count=n)
+            away_ids = np.fromiter((team_index.setdefault(m['away_team_id'], len(team_index)) for m in table), dtype=np.int32, count=n)
+            home_scores = np.fromiter((m['home_score'] for m in table), dtype=np.int32, count=n)
+            away_scores = np.fromiter((m['away_score'] for m in table), dtype=np.int32, count=n)
+            dates = np.array([m['match_date'] for m in table], dtype='datetime64[ms]').astype(np.int64)
             
+            matches = [match for match in matches if isinstance(match['match_date'], datetime)]
             if not matches:
-                return self._get_default_stats()
-            
-            # İstatistikleri hesapla
-            stats = {
-                'games_played': len(matches),
-                'wins': 0,
-                'draws': 0,
-                'losses': 0,
-                'goals_for': 0,
-                'goals_against': 0,
-                'goals_avg': 0.0,
-                'goals_against_avg': 0.0,
-                'clean_sheets': 0,
-                'btts_count': 0,
-                'over_2_5_count': 0,
-                'form_points': 0
-            }
+                return
             
-            for match in matches:
-                is_home = match['home_team_id'] == team_id
-                our_score = match['home_score'] if is_home else match['away_score']
-                opponent_score = match['away_score'] if is_home else match['home_score']
-                
-                stats['goals_for'] += our_score
-                stats['goals_against'] += opponent_score
-                
-                # Sonuç
-                if our_score > opponent_score:
-                    stats['wins'] += 1
-                    stats['form_points'] += 3
-                elif our_score == opponent_score:
-                    stats['draws'] += 1
-                    stats['form_points'] += 1
-                else:
-                    stats['losses'] += 1
-                
-                # Diğer istatistikler
-                if opponent_score == 0:
-                    stats['clean_sheets'] += 1
-                
-                if our_score > 0 and opponent_score > 0:
-                    stats['btts_count'] += 1
-                
-                if our_score + opponent_score > 2.5:
-                    stats['over_2_5_count'] += 1
+            # Ev sahibi için ev, deplasman takımı için deplasman pencereleri
+            queries = [
+                (team_id, match['match_date'], venue)
+                for match in matches
+                for team_id, venue in ((match['home_team_id'], 'home'), (match['away_team_id'], 'away'))
+            ]
+            
+            stats = compute_rolling(
+                home_ids, away_ids, home_scores, away_scores, dates,
+                np.array([team_index.get(team_id, -1) for team_id, _, _ in queries], dtype=np.int32),
+                np.array([match_date for _, match_date, _ in queries], dtype='datetime64[ms]').astype(np.int64),
+                np.array([VENUE_CODES[venue] for _, _, venue in queries], dtype=np.int8),
+                TEAM_STATS_WINDOW
+            )
             
-            # Ortalamalar
-            stats['goals_avg'] = stats['goals_for'] / len(matches)
-            stats['goals_against_avg'] = stats['goals_against'] / len(matches)
+            for (team_id, match_date, venue), row in zip(queries, stats):
+                self._cache_put(('team', team_id, venue, _date_bucket(match_date)), row_to_stats(row))
+            
+            # H2H, _get_h2h_stats önbelleği gibi küçük id'li takım açısından
+            pairs = [
+                (*sorted((match['home_team_id'], match['away_team_id'])), match['match_date'])
+                for match in matches
+            ]
+            h2h = compute_h2h(
+                home_ids, away_ids, home_scores, away_scores, dates,
+                np.array([team_index.get(low_team, -1) for low_team, _, _ in pairs], dtype=np.int32),
+                np.array([team_index.get(high_team, -1) for _, high_team, _ in pairs], dtype=np.int32),
+                np.array([match_date for _, _, match_date in pairs], dtype='datetime64[ms]').astype(np.int64),
+                H2H_WINDOW
+            )
             
-            return stats
+            for (low_team, high_team, match_date), row in zip(pairs, h2h):
+                self._cache_put(('h2h', low_team, high_team, _date_bucket(match_date)), row_to_h2h(row))
             
+        except Exception as e:
+            # Önbellek doldurulamazsa istatistikler tek tek sorgulanır
+            logger.error(f"Toplu maç istatistiği hesaplama hatası: {e}")
+    
+    async def _get_team_recent_stats(self, team_id: str, match_date: datetime, venue: str = 'all') -> Dict[str, float]:
+        """Takımın son maçlardaki performansını al"""
+        key = ('team', team_id, venue, _date_bucket(match_date))
+        stats = self._cache_get(key)
+        if stats is not None:
+            return stats
+        
+        try:
+            stats = await self._fetch_team_recent_stats(team_id, match_date, venue)
         except Exception as e:
             logger.error(f"Takım istatistikleri alma hatası: {e}")
             return self._get_default_stats()
+        
+        self._cache_put(key, stats)
+        return stats
+    
+    async def _fetch_team_recent_stats(self, team_id: str, match_date: datetime, venue: str) -> Dict[str, float]:
+        """Takımın son maç istatistiklerini veritabanından hesapla"""
+        # Son 10 maçı al
+        query = {
+            "$or": [
+                {"home_team_id": team_id},
+                {"away_team_id": team_id}
+            ],
+            "match_date": {"$lt": match_date},
+            "status": "finished"
+        }
+        
+        if venue == 'home':
+            query = {"home_team_id": team_id, "match_date": {"$lt": match_date}, "status": "finished"}
+        elif venue == 'away':
+            query = {"away_team_id": team_id, "match_date": {"$lt": match_date}, "status": "finished"}
+        
+        matches = await self.db.matches.find(query, SCORE_PROJECTION).sort("match_date", -1).limit(10).to_list(10)
+        
+        if not matches:
+            return self._get_default_stats()
+        
+        # İstatistikleri hesapla (takım açısından atılan/yenen goller)
+        n = len(matches)
+        home_score = np.fromiter((m['home_score'] for m in matches), dtype=np.int16, count=n)
+        away_score = np.fromiter((m['away_score'] for m in matches), dtype=np.int16, count=n)
+        is_home = np.fromiter((m['home_team_id'] == team_id for m in matches), dtype=bool, count=n)
+        
+        our = np.where(is_home, home_score, away_score)
+        opp = np.where(is_home, away_score, home_score)
+        
+        wins = int((our > opp).sum())
+        draws = int((our == opp).sum())
+        goals_for = int(our.sum())
+        goals_against = int(opp.sum())
+        
+        return {
+            'games_played': n,
+            'wins': wins,
+            'draws': draws,
+            'losses': n - wins - draws,
+            'goals_for': goals_for,
+            'goals_against': goals_against,
+            'goals_avg': goals_for / n,
+            'goals_against_avg': goals_against / n,
+            'clean_sheets': int((opp == 0).sum()),
+            'btts_count': int(((our > 0) & (opp > 0)).sum()),
+            'over_2_5_count': int((our + opp > 2.5).sum()),
+            'form_points': wins * 3 + draws
+        }
     
     async def _get_h2h_stats(self, home_team_id: str, away_team_id: str, match_date: datetime) -> Dict[str, float]:
         """Head-to-head istatistiklerini al"""
-        try:
-            # Son 5 karşılaşmayı al
-            matches = await self.db.matches.find({
-                "$or": [
-                    {"home_team_id": home_team_id, "away_team_id": away_team_id},
-                    {"home_team_id": away_team_id, "away_team_id": home_team_id}
-                ],
-                "match_date": {"$lt": match_date},
-                "status": "finished"
-            }).sort("match_date", -1).limit(5).to_list(5)
-            
-            if not matches:
+        # Çift sıralı tutulur; istatistik küçük id'li takım açısından saklanır
+        low_team, high_team = sorted((home_team_id, away_team_id))
+        key = ('h2h', low_team, high_team, _date_bucket(match_date))
+        stats = self._cache_get(key)
+        
+        if stats is None:
+            try:
+                stats = await self._fetch_h2h_stats(low_team, high_team, match_date)
+            except Exception as e:
+                logger.error(f"H2H istatistikleri alma hatası: {e}")
                 return {'h2h_games': 0, 'h2h_wins': 0, 'h2h_draws': 0, 'h2h_losses': 0}
             
-            stats = {
-                'h2h_games': len(matches),
-                'h2h_wins': 0,
-                'h2h_draws': 0,
-                'h2h_losses': 0
-            }
-            
-            for match in matches:
-                is_home = match['home_team_id'] == home_team_id
-                our_score = match['home_score'] if is_home else match['away_score']
-                opponent_score = match['away_score'] if is_home else match['home_score']
-                
-                if our_score > opponent_score:
-                    stats['h2h_wins'] += 1
-                elif our_score == opponent_score:
-                    stats['h2h_draws'] += 1
-                else:
-                    stats['h2h_losses'] += 1
-            
+            self._cache_put(key, stats)
+        
+        if home_team_id == low_team:
             return stats
-            
-        except Exception as e:
-            logger.error(f"H2H istatistikleri alma hatası: {e}")
+        
+        # Ev sahibi açısından galibiyet/mağlubiyet yer değiştirir
+        return {**stats, 'h2h_wins': stats['h2h_losses'], 'h2h_losses': stats['h2h_wins']}
+    
+    async def _fetch_h2h_stats(self, home_team_id: str, away_team_id: str, match_date: datetime) -> Dict[str, float]:
+        """H2H istatistiklerini veritabanından hesapla"""
+        # Son 5 karşılaşmayı al
+        matches = await self.db.matches.find({
+            "$or": [
+                {"home_team_id": home_team_id, "away_team_id": away_team_id},
+                {"home_team_id": away_team_id, "away_team_id": home_team_id}
+            ],
+            "match_date": {"$lt": match_date},
+            "status": "finished"
+        }, SCORE_PROJECTION).sort("match_date", -1).limit(5).to_list(5)
+        
+        if not matches:
             return {'h2h_games': 0, 'h2h_wins': 0, 'h2h_draws': 0, 'h2h_losses': 0}
+        
+        stats = {
+            'h2h_games': len(matches),
+            'h2h_wins': 0,
+            'h2h_draws': 0,
+            'h2h_losses': 0
+        }
+        
+        for match in matches:
+            is_home = match['home_team_id'] == home_team_id
+            our_score = match['home_score'] if is_home else match['away_score']
+            opponent_score = match['away_score'] if is_home else match['home_score']
+            
+            if our_score > opponent_score:
+                stats['h2h_wins'] += 1
+            elif our_score == opponent_score:
+                stats['h2h_draws'] += 1
+            else:
+                stats['h2h_losses'] += 1
+        
+        return stats
     
     def _get_default_stats(self) -> Dict[str, float]:
         """Varsayılan istatistikler"""
@@ -390,7 +760,8 @@ class PredictionEngine:
     async def generate_predictions(self, match_ids: Optional[List[str]] = None):
         """Tahmin üret"""
         try:
-            # Modelleri başlat
+            # Başka süreçte yeniden eğitilen modelleri al, eksikleri başlat (yüklü olanlar tekrar okunmaz)
+            self._drop_stale_models()
             await self.initialize_models()
             
             # Tahmin yapılacak maçları al
@@ -398,125 +769,149 @@ class PredictionEngine:
             if match_ids:
                 query["id"] = {"$in": match_ids}
             
-            matches = await self.db.matches.find(query).to_list(1000)
+            matches = await self.db.matches.find(query, SCHEDULED_MATCH_PROJECTION).to_list(1000)
             
             if not matches:
                 logger.warning("Tahmin yapılacak maç bulunamadı")
                 return
             
-            predictions_generated = 0
-            
-            for match in matches:
-                try:
-                    # Her bahis tipi için tahmin yap
-                    for bet_type in self.model_configs.keys():
-                        if bet_type not in self.models:
-                            continue
-                        
-                        prediction = await self._predict_match(match, bet_type)
-                        
-                        if prediction:
-                            # Mevcut tahmin var mı kontrol et
-                            existing = await self.db.predictions.find_one({
-                                "match_id": match['id'],
-                                "bet_type": bet_type
-                            })
-                            
-                            if not existing:
-                                await self.db.predictions.insert_one(prediction.dict())
-                                predictions_generated += 1
-                                logger.info(f"Tahmin oluşturuldu: {bet_type} - {prediction.predicted_outcome}")
-                            else:
-                                # Mevcut tahmini güncelle
-                                await self.db.predictions.update_one(
-                                    {"_id": existing["_id"]},
-                                    {"$set": prediction.dict()}
-                                )
-                    
-                except Exception as e:
-                    logger.error(f"Maç tahmini hatası: {e}")
+            # Son sonuçlar pencereleri değiştirmiş olabilir
+            self._stats_cache.clear()
+            await self._prefill_match_stats(matches)
+            
+            # Feature'ları maç başına bir kez, eşzamanlı oluştur; tüm bahis tipleri paylaşır
+            semaphore = asyncio.Semaphore(FEATURE_CONCURRENCY)
+            
+            async def create_features(match):
+                async with semaphore:
+                    return await self._create_match_features(match)
+            
+            all_features = await asyncio.gather(*(create_features(match) for match in matches))
+            
+            predict_matches = []
+            match_features = []
+            for match, features in zip(matches, all_features):
+                if features is not None:
+                    predict_matches.append(match)
+                    match_features.append(features)
+            
+            if not match_features:
+                logger.warning("Feature oluşturulamadı, tahmin yapılmadı")
+                return
+            
+            predictions = []
+            for bet_type in self.model_configs.keys():
+                if bet_type not in self.models:
                     continue
+                
+                predictions.extend(self._predict_batch(predict_matches, match_features, bet_type))
+            
+            if not predictions:
+                logger.info("Toplam 0 tahmin oluşturuldu")
+                return
+            
+            # Tek bulk_write: (match_id, bet_type) varsa güncelle, yoksa ekle
+            result = await self.db.predictions.bulk_write([
+                UpdateOne(
+                    {"match_id": prediction.match_id, "bet_type": prediction.bet_type},
+                    {"$set": prediction.model_dump()},
+                    upsert=True
+                )
+                for prediction in predictions
+            ], ordered=False)
+            predictions_generated = result.upserted_count
             
             logger.info(f"Toplam {predictions_generated} tahmin oluşturuldu")
             
         except Exception as e:
             logger.error(f"Tahmin üretme hatası: {e}")
     
-    async def _predict_match(self, match: Dict[str, Any], bet_type: str) -> Optional[Prediction]:
-        """Belirli bir maç için tahmin yap"""
+    def _predict_batch(
+        self,
+        matches: List[Dict[str, Any]],
+        match_features: List[Dict[str, Any]],
+        bet_type: str
+    ) -> List[Prediction]:
+        """Tüm maçlar için tek predict_proba çağrısıyla tahmin yap"""
         try:
-            # Feature'ları oluştur
-            features = await self._create_match_features(match)
-            
-            if features is None:
-                return None
-            
-            # Model ile tahmin yap
             model = self.models[bet_type]
             scaler = self.scalers[bet_type]
             
-            # Features'ı DataFrame'e çevir
-            feature_df = pd.DataFrame([features]).fillna(0)
-            
-            # Eksik kolonları ekle (eğitim sırasında kullanılan feature'lar)
-            for col in scaler.feature_names_in_:
-                if col not in feature_df.columns:
-                    feature_df[col] = 0
-            
-            # Sıralamayı eğitim verisi ile aynı yap
-            feature_df = feature_df[scaler.feature_names_in_]
-            
-            # Scale ve tahmin
-            features_scaled = scaler.transform(feature_df)
-            prediction_proba = model.predict_proba(features_scaled)[0]
-            predicted_class = model.predict(features_scaled)[0]
-            
-            # Sonuçları yorumla
-            outcome, confidence = self._interpret_prediction(bet_type, predicted_class, prediction_proba)
+            feature_index = self._feature_index[bet_type]
+            
+            # Matrisi doğrudan eğitimdeki kolon sırasıyla doldur; eksik feature'lar 0 kalır
+            arr = np.zeros((len(match_features), len(feature_index)), dtype=np.float32)
+            for row, features in enumerate(match_features):
+                for name, value in features.items():
+                    col = feature_index.get(name)
+                    # One-hot id kolonu; bilinmeyen id'nin kolonu yoktur, satır 0 kalır
+                    if col is None and name in ID_FEATURES:
+                        col = feature_index.get(f"{name}={value}")
+                        value = 1
+                    if col is not None and value is not None:
+                        arr[row, col] = value
+            
+            # Scale ve tahmin (eğitimdeki gibi float32, C-order)
+            features_scaled = arr
+            if scaler is not None:
+                features_scaled = np.ascontiguousarray(scaler.transform(arr), dtype=np.float32)
+            probabilities = model.predict_proba(features_scaled)
+            
+            # Sonuçları toplu yorumla
+            outcomes, confidences = self._interpret_predictions(bet_type, probabilities, model.classes_)
             
-            if confidence < 0.6:  # Düşük güven seviyesi
-                return None
+        except Exception as e:
+            logger.error(f"Maç tahmin hatası ({bet_type}): {e}")
+            return []
+        
+        predictions = []
+        # Düşük güven seviyesindeki tahminler atlanır
+        for i in np.flatnonzero(confidences >= 0.6):
+            match = matches[i]
+            confidence = float(confidences[i])
             
-            prediction = Prediction(
+            predictions.append(Prediction(
                 match_id=match['id'],
                 league_id=match['league_id'],
                 home_team_id=match['home_team_id'],
                 away_team_id=match['away_team_id'],
                 match_date=match['match_date'],
                 bet_type=bet_type,
-                predicted_outcome=outcome,
+                predicted_outcome=outcomes[i],
                 confidence=confidence * 100,
-                probability=max(prediction_proba),
+                probability=confidence,
                 model_version="1.0",
-                model_features=features
-            )
-            
-            return prediction
-            
-        except Exception as e:
-            logger.error(f"Maç tahmin hatası ({bet_type}): {e}")
-            return None
+                model_features=match_features[i]
+            ))
+        
+        return predictions
     
     async def _create_match_features(self, match: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Maç için feature'ları oluştur"""
         try:
             features = {
-                'home_team_id': match['home_team_id'],
-                'away_team_id': match['away_team_id'],
-                'league_id': match['league_id']
+                'home_team_id': self._team_code(match['home_team_id']),
+                'away_team_id': self._team_code(match['away_team_id']),
+                'league_id': self._league_code(match['league_id'])
             }
             
-            # Takım istatistikleri
-            home_stats = await self._get_team_recent_stats(
-                match['home_team_id'], 
-                match['match_date'], 
-                venue='home'
-            )
-            
-            away_stats = await self._get_team_recent_stats(
-                match['away_team_id'], 
-                match['match_date'], 
-                venue='away'
+            # Takım ve H2H istatistikleri (sorgular eşzamanlı)
+            home_stats, away_stats, h2h_stats = await asyncio.gather(
+                self._get_team_recent_stats(
+                    match['home_team_id'], 
+                    match['match_date'], 
+                    venue='home'
+                ),
+                self._get_team_recent_stats(
+                    match['away_team_id'], 
+                    match['match_date'], 
+                    venue='away'
+                ),
+                self._get_h2h_stats(
+                    match['home_team_id'], 
+                    match['away_team_id'], 
+                    match['match_date']
+                )
             )
             
             # Features'ları ekle
@@ -527,12 +922,6 @@ class PredictionEngine:
                 features[f'away_{key}'] = value
             
             # H2H
-            h2h_stats = await self._get_h2h_stats(
-                match['home_team_id'], 
-                match['away_team_id'], 
-                match['match_date']
-            )
-            
             for key, value in h2h_stats.items():
                 features[f'h2h_{key}'] = value
             
@@ -551,28 +940,20 @@ class PredictionEngine:
             logger.error(f"Match feature oluşturma hatası: {e}")
             return None
     
-    def _interpret_prediction(self, bet_type: str, predicted_class: int, probabilities: np.ndarray) -> Tuple[str, float]:
-        """Tahmin sonucunu yorumla"""
-        if bet_type == '1X2':
-            outcomes = ['X', '1', '2']  # Draw, Home win, Away win
-            outcome = outcomes[predicted_class]
-            confidence = probabilities[predicted_class]
-            
-        elif bet_type == 'O/U2.5':
-            outcomes = ['Under 2.5', 'Over 2.5']
-            outcome = outcomes[predicted_class]
-            confidence = probabilities[predicted_class]
-            
-        elif bet_type == 'BTTS':
-            outcomes = ['No', 'Yes']
-            outcome = outcomes[predicted_class]
-            confidence = probabilities[predicted_class]
-            
-        else:
-            outcome = str(predicted_class)
-            confidence = max(probabilities)
+    def _interpret_predictions(self, bet_type: str, probabilities: np.ndarray,
+                               classes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Tahmin sonuçlarını yorumla: her satır için (sonuç etiketi, güven)"""
+        columns = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(probabilities)), columns]
+        # predict_proba kolonları model.classes_ sırasındadır; eğitimde görülmeyen sınıfın
+        # kolonu olmadığından kolon indeksi sınıf etiketiyle aynı olmayabilir
+        predicted_classes = np.asarray(classes)[columns]
+        
+        table = self._outcome_tables.get(bet_type)
+        if table is None:
+            return predicted_classes.astype(str), confidences
         
-        return outcome, confidence
+        return table[predicted_classes], confidences
     
     async def evaluate_predictions(self):
         """Tahmin performansını değerlendir"""
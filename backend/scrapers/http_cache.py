@@ -0,0 +1,68 @@
+"""Scraper GET istekleri için Mongo tabanlı yanıt önbelleği
+
+Yanıt gövdesi URL'nin sha256'sı ile `http_cache` koleksiyonunda saklanır;
+süresi dolmamış kayıt varsa istek hiç atılmaz. Yalnızca 200 yanıtlar
+önbelleğe alınır. `expires` alanındaki TTL index'i süresi dolan kayıtları siler.
+Ağa giden istekler host limiter'ından geçer; 429 ve geçici 5xx yanıtlarında
+Retry-After ya da jitter'lı üstel bekleme sonrası yeniden denenir.
+"""
+import asyncio
+import hashlib
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from scrapers.rate_limit import host_limiter, retry_after_seconds
+
+TTL_SHORT = 300  # saniye; bugünkü / yakın tarihli maçlar
+TTL_HOUR = 60 * 60
+TTL_DAY = 24 * 60 * 60
+TTL_WEEK = 7 * TTL_DAY  # bitmiş maçlar değişmez
+FINISHED_AFTER_DAYS = 2
+
+# Yeniden denenen geçici hata kodları
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_ATTEMPTS = 4
+MAX_BACKOFF = 30  # saniye
+
+
+def ttl_for_date(day: datetime) -> int:
+    """Tarihli endpoint için TTL: 2 günden eski maçlar uzun, diğerleri kısa süre saklanır"""
+    if day.date() < (datetime.utcnow() - timedelta(days=FINISHED_AFTER_DAYS)).date():
+        return TTL_WEEK
+    return TTL_SHORT
+
+
+async def cached_get(db, session: aiohttp.ClientSession, url: str, ttl_seconds: int,
+                     headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+    """URL'yi önbellekten ya da ağdan getir -> (HTTP status, ham gövde)"""
+    key = hashlib.sha256(url.encode()).hexdigest()
+    now = datetime.utcnow()
+
+    doc = await db.http_cache.find_one({"_id": key, "expires": {"$gt": now}}, {"body": 1})
+    if doc:
+        return 200, doc['body']
+
+    for attempt in range(MAX_ATTEMPTS):
+        async with host_limiter(url):
+            async with session.get(url, headers=headers) as response:
+                status = response.status
+                body = await response.read()
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+
+        if status not in RETRY_STATUSES or attempt == MAX_ATTEMPTS - 1:
+            break
+        if retry_after is None:
+            retry_after = min(2 ** attempt, MAX_BACKOFF) + random.random()
+        await asyncio.sleep(retry_after)
+
+    if status == 200:
+        await db.http_cache.update_one(
+            {"_id": key},
+            {"$set": {"url": url, "body": body, "expires": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+
+    return status, body
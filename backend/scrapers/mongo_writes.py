@@ -0,0 +1,48 @@
+"""Scraper'ların ortak Mongo yazma yardımcıları"""
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+def log_duplicate_write_errors(label: str, bwe: BulkWriteError):
+    """Bulk yazma hatalarını özetle; duplicate key (11000) hataları beklenen durumdur,
+    diğer yazma hataları yükseltilir"""
+    write_errors = bwe.details.get('writeErrors', [])
+    duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
+    if duplicates:
+        logger.warning(f"{label} bulk yazma: {duplicates} kayıt zaten mevcut, atlandı")
+    if len(write_errors) > duplicates:
+        raise bwe
+
+
+async def insert_new_docs(collection, docs: List[Dict[str, Any]], label: str) -> int:
+    """Yeni belgeleri tek insert_many ile yaz -> eklenen kayıt sayısı
+
+    ordered=False ile yarışta başka kaynağın eklediği kayıtların duplicate key
+    (11000) hataları atlanır; diğer yazma hataları yükseltilir.
+    """
+    if not docs:
+        return 0
+
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as bwe:
+        log_duplicate_write_errors(label, bwe)
+        return bwe.details.get('nInserted', 0)
+
+
+async def existing_match_keys(db, league_id: str, matches: List[Dict[str, Any]]) -> Set[Tuple[str, str, Any]]:
+    """Çekilen maçların tarih aralığında ligde zaten kayıtlı (home, away, tarih) anahtarları"""
+    if not matches:
+        return set()
+
+    dates = [match_data['match_date'] for match_data in matches]
+    existing = await db.matches.find(
+        {"league_id": league_id, "match_date": {"$gte": min(dates), "$lte": max(dates)}},
+        {"home_team_id": 1, "away_team_id": 1, "match_date": 1, "_id": 0}
+    ).to_list(None)
+    return {(m['home_team_id'], m['away_team_id'], m['match_date']) for m in existing}
@@ -0,0 +1,51 @@
+"""Host bazlı istek hız sınırlayıcıları ve Retry-After yardımcısı
+
+Sabit `asyncio.sleep` beklemeleri yerine her sağlayıcı host'u için bir token
+bucket (aiolimiter) kullanılır; önbellekten dönen istekler token harcamaz.
+"""
+from contextlib import nullcontext
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from types import MappingProxyType
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from aiolimiter import AsyncLimiter
+
+MAX_RETRY_AFTER = 60  # saniye
+
+# host -> (istek sayısı, saniye)
+HOST_RATE_LIMITS = MappingProxyType({
+    'api.sofascore.com': (10, 1.0),
+    'understat.com': (5, 1.0),
+})
+
+_limiters: Dict[str, AsyncLimiter] = {}
+
+
+def host_limiter(url: str):
+    """URL'nin host'una ait limiter; sınırı tanımlı olmayan host'lar için no-op context"""
+    host = urlsplit(url).hostname
+    if host not in HOST_RATE_LIMITS:
+        return nullcontext()
+
+    limiter = _limiters.get(host)
+    if limiter is None:
+        max_rate, time_period = HOST_RATE_LIMITS[host]
+        limiter = _limiters[host] = AsyncLimiter(max_rate, time_period)
+    return limiter
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After başlığını (saniye ya da HTTP tarihi) saniyeye çevir"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
@@ -1,101 +1,216 @@
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import aiohttp
 import json
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential_jitter, retry_if_exception
 import random
 import time
+from types import MappingProxyType
 
 from scrapers.understat_scraper import UnderstatScraper
 from scrapers.sofascore_scraper import SofascoreScraper
 from scrapers.flashscore_scraper import FlashscoreScraper
+from scrapers.http_cache import MAX_BACKOFF, RETRY_STATUSES
+from scrapers.rate_limit import retry_after_seconds
 from models.database_models import League, Team, Match, ScrapingJob, SystemLog
 
 logger = logging.getLogger(__name__)
 
+UA_POOL_SIZE = 50
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 1.0  # saniye
+
+# Scraping sorgularının kullandığı index'leri; teams (league_id, name) ve unique matches
+# (home_team_id, away_team_id, match_date) index'leri EnhancedDataCollector.ensure_indexes
+# içinde oluşturulur; maç filtresindeki league_id bu unique anahtarın üzerine ek koşul
+# olduğundan ayrı index gerekmez
+SCRAPER_INDEXES = (
+    ("leagues", [("league_code", 1)], {"unique": True}),
+    # Scraper'lar ligleri {"id": {"$in": ...}}, takımları {"id": ...} ile okur/günceller
+    ("leagues", [("id", 1)], {"unique": True}),
+    ("teams", [("id", 1)], {"unique": True}),
+    # get_scraping_stats son 24 saatin joblarını created_at ile süzer
+    ("scraping_jobs", [("created_at", 1)], {}),
+    # SofaScore / Understat takım eşleştirmesi dış ID ile yapılır; ligde bir dış ID
+    # tek takıma ait olabilir. Dış ID'si olmayan takımlar index'e girmez.
+    *(
+        ("teams", [("league_id", 1), (f"external_ids.{source}", 1)],
+         {"unique": True, "partialFilterExpression": {f"external_ids.{source}": {"$exists": True}}})
+        for source in ("sofascore", "understat")
+    ),
+    # HTTP yanıt önbelleği süresi dolunca silinir
+    ("http_cache", [("expires", 1)], {"expireAfterSeconds": 0}),
+)
+
+_backoff = wait_exponential_jitter(initial=2, max=MAX_BACKOFF)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Yeniden denenecek hata: 429/5xx yanıtı, bağlantı hatası ya da zaman aşımı (4xx denenmez)"""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in RETRY_STATUSES
+    return isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+def _retry_wait(retry_state) -> float:
+    """Sunucu Retry-After verdiyse o kadar, vermediyse jitter'lı üstel bekle"""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, aiohttp.ClientResponseError) and exc.headers:
+        retry_after = retry_after_seconds(exc.headers.get('Retry-After'))
+        if retry_after is not None:
+            return retry_after
+    return _backoff(retry_state)
+
+# Desteklenen ligler - Dinamik olarak genişletilebilir
+SUPPORTED_LEAGUES = MappingProxyType({
+    'EPL': {'name': 'Premier League', 'country': 'England', 'priority': 1},
+    'LALIGA': {'name': 'La Liga', 'country': 'Spain', 'priority': 1},
+    'SERIEA': {'name': 'Serie A', 'country': 'Italy', 'priority': 1},
+    'BUNDESLIGA': {'name': 'Bundesliga', 'country': 'Germany', 'priority': 1},
+    'LIGUE1': {'name': 'Ligue 1', 'country': 'France', 'priority': 1},
+    'UCL': {'name': 'UEFA Champions League', 'country': 'Europe', 'priority': 1},
+    'UEL': {'name': 'UEFA Europa League', 'country': 'Europe', 'priority': 2},
+    'EREDIVISIE': {'name': 'Eredivisie', 'country': 'Netherlands', 'priority': 2},
+    'LIGANOS': {'name': 'Liga NOS', 'country': 'Portugal', 'priority': 2},
+    'SUPERLIG': {'name': 'Süper Lig', 'country': 'Turkey', 'priority': 2},
+    'CHAMPIONSHIP': {'name': 'Championship', 'country': 'England', 'priority': 2},
+    'LIGA2': {'name': 'La Liga 2', 'country': 'Spain', 'priority': 3},
+    'SERIEB': {'name': 'Serie B', 'country': 'Italy', 'priority': 3},
+    'BUNDESLIGA2': {'name': '2. Bundesliga', 'country': 'Germany', 'priority': 3},
+    'LIGUE2': {'name': 'Ligue 2', 'country': 'France', 'priority': 3},
+    'MLS': {'name': 'Major League Soccer', 'country': 'USA', 'priority': 2},
+    'BRASILEIRAO': {'name': 'Brasileirão', 'country': 'Brazil', 'priority': 2},
+    'PRIMERA': {'name': 'Primera División', 'country': 'Argentina', 'priority': 2},
+    'LIGA_MX': {'name': 'Liga MX', 'country': 'Mexico', 'priority': 2},
+    'ALLSVENSKAN': {'name': 'Allsvenskan', 'country': 'Sweden', 'priority': 3},
+    'SUPERLIGA': {'name': 'Superliga', 'country': 'Denmark', 'priority': 3},
+    'JUPILER': {'name': 'Jupiler Pro League', 'country': 'Belgium', 'priority': 3},
+    'AUSTRIA': {'name': 'Austrian Bundesliga', 'country': 'Austria', 'priority': 3},
+    'CZECH': {'name': 'Czech First League', 'country': 'Czech Republic', 'priority': 3},
+    'POLAND': {'name': 'Ekstraklasa', 'country': 'Poland', 'priority': 3},
+    'ROMANIA': {'name': 'Liga I', 'country': 'Romania', 'priority': 3},
+    'GREECE': {'name': 'Super League', 'country': 'Greece', 'priority': 3},
+    'SCOTLAND': {'name': 'Scottish Premiership', 'country': 'Scotland', 'priority': 3},
+    'NORWAY': {'name': 'Eliteserien', 'country': 'Norway', 'priority': 3},
+    'SWITZERLAND': {'name': 'Super League', 'country': 'Switzerland', 'priority': 3},
+    'CROATIA': {'name': 'HNL', 'country': 'Croatia', 'priority': 3},
+    'SERBIA': {'name': 'SuperLiga', 'country': 'Serbia', 'priority': 3},
+    'UKRAINE': {'name': 'Premier League', 'country': 'Ukraine', 'priority': 3},
+    'BULGARIA': {'name': 'First League', 'country': 'Bulgaria', 'priority': 3},
+    'JLEAGUE': {'name': 'J-League', 'country': 'Japan', 'priority': 3},
+    'KLEAGUE': {'name': 'K-League', 'country': 'South Korea', 'priority': 3},
+    'CSL': {'name': 'Chinese Super League', 'country': 'China', 'priority': 3},
+    'AUSTRALIAN': {'name': 'A-League', 'country': 'Australia', 'priority': 3},
+    'CHILE': {'name': 'Primera División', 'country': 'Chile', 'priority': 3},
+    'COLOMBIA': {'name': 'Liga BetPlay', 'country': 'Colombia', 'priority': 3},
+    'ECUADOR': {'name': 'Serie A', 'country': 'Ecuador', 'priority': 3},
+    'PERU': {'name': 'Liga 1', 'country': 'Peru', 'priority': 3},
+    'URUGUAY': {'name': 'Primera División', 'country': 'Uruguay', 'priority': 3},
+    'VENEZUELA': {'name': 'Primera División', 'country': 'Venezuela', 'priority': 3},
+    'BOLIVIA': {'name': 'Liga de Fútbol Profesional', 'country': 'Bolivia', 'priority': 3},
+    'PARAGUAY': {'name': 'Primera División', 'country': 'Paraguay', 'priority': 3},
+    'MOROCCO': {'name': 'Botola', 'country': 'Morocco', 'priority': 3},
+    'EGYPT': {'name': 'Premier League', 'country': 'Egypt', 'priority': 3},
+    'SOUTH_AFRICA': {'name': 'Premier Division', 'country': 'South Africa', 'priority': 3},
+    'TUNISIA': {'name': 'Ligue Professionnelle 1', 'country': 'Tunisia', 'priority': 3},
+    'ALGERIA': {'name': 'Ligue Professionnelle 1', 'country': 'Algeria', 'priority': 3},
+    'GHANA': {'name': 'Premier League', 'country': 'Ghana', 'priority': 3},
+    'NIGERIA': {'name': 'Professional Football League', 'country': 'Nigeria', 'priority': 3},
+    'INDIA': {'name': 'Indian Super League', 'country': 'India', 'priority': 3},
+    'THAILAND': {'name': 'Thai League 1', 'country': 'Thailand', 'priority': 3},
+    'MALAYSIA': {'name': 'Super League', 'country': 'Malaysia', 'priority': 3},
+    'SINGAPORE': {'name': 'Premier League', 'country': 'Singapore', 'priority': 3},
+    'INDONESIA': {'name': 'Liga 1', 'country': 'Indonesia', 'priority': 3}
+})
+# run_scraping_job'daki öncelik sıralaması için
+PRIORITY_BY_CODE = MappingProxyType({code: info['priority'] for code, info in SUPPORTED_LEAGUES.items()})
+
 class ScraperManager:
     def __init__(self, db):
         self.db = db
         self.ua = UserAgent()
-        self.scrapers = {
-            'understat': UnderstatScraper(db),
-            'sofascore': SofascoreScraper(db),
-            'flashscore': FlashscoreScraper(db)
+        # fake_useragent her çağrıda yavaş; istekler önceden örneklenmiş havuzdan seçer
+        self._ua_pool = [self.ua.random for _ in range(UA_POOL_SIZE)]
+        self._base_headers = {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'Upgrade-Insecure-Requests': '1'
         }
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.scrapers = self._create_scrapers()
+        # SystemLog kayıtları kuyruktan toplu yazılır
+        self._log_q: asyncio.Queue = asyncio.Queue()
+        self._log_task: Optional[asyncio.Task] = None
+        # Her scraping job'u bittiğinde çağrılır (ör. API'nin lig önbelleğini temizlemek için)
+        self.on_job_complete: Optional[Callable[[], None]] = None
         
-        # Desteklenen ligler - Dinamik olarak genişletilebilir
-        self.supported_leagues = {
-            'EPL': {'name': 'Premier League', 'country': 'England', 'priority': 1},
-            'LALIGA': {'name': 'La Liga', 'country': 'Spain', 'priority': 1},
-            'SERIEA': {'name': 'Serie A', 'country': 'Italy', 'priority': 1},
-            'BUNDESLIGA': {'name': 'Bundesliga', 'country': 'Germany', 'priority': 1},
-            'LIGUE1': {'name': 'Ligue 1', 'country': 'France', 'priority': 1},
-            'UCL': {'name': 'UEFA Champions League', 'country': 'Europe', 'priority': 1},
-            'UEL': {'name': 'UEFA Europa League', 'country': 'Europe', 'priority': 2},
-            'EREDIVISIE': {'name': 'Eredivisie', 'country': 'Netherlands', 'priority': 2},
-            'LIGANOS': {'name': 'Liga NOS', 'country': 'Portugal', 'priority': 2},
-            'SUPERLIG': {'name': 'Süper Lig', 'country': 'Turkey', 'priority': 2},
-            'CHAMPIONSHIP': {'name': 'Championship', 'country': 'England', 'priority': 2},
-            'LIGA2': {'name': 'La Liga 2', 'country': 'Spain', 'priority': 3},
-            'SERIEB': {'name': 'Serie B', 'country': 'Italy', 'priority': 3},
-            'BUNDESLIGA2': {'name': '2. Bundesliga', 'country': 'Germany', 'priority': 3},
-            'LIGUE2': {'name': 'Ligue 2', 'country': 'France', 'priority': 3},
-            'MLS': {'name': 'Major League Soccer', 'country': 'USA', 'priority': 2},
-            'BRASILEIRAO': {'name': 'Brasileirão', 'country': 'Brazil', 'priority': 2},
-            'PRIMERA': {'name': 'Primera División', 'country': 'Argentina', 'priority': 2},
-            'LIGA_MX': {'name': 'Liga MX', 'country': 'Mexico', 'priority': 2},
-            'ALLSVENSKAN': {'name': 'Allsvenskan', 'country': 'Sweden', 'priority': 3},
-            'SUPERLIGA': {'name': 'Superliga', 'country': 'Denmark', 'priority': 3},
-            'JUPILER': {'name': 'Jupiler Pro League', 'country': 'Belgium', 'priority': 3},
-            'AUSTRIA': {'name': 'Austrian Bundesliga', 'country': 'Austria', 'priority': 3},
-            'CZECH': {'name': 'Czech First League', 'country': 'Czech Republic', 'priority': 3},
-            'POLAND': {'name': 'Ekstraklasa', 'country': 'Poland', 'priority': 3},
-            'ROMANIA': {'name': 'Liga I', 'country': 'Romania', 'priority': 3},
-            'GREECE': {'name': 'Super League', 'country': 'Greece', 'priority': 3},
-            'SCOTLAND': {'name': 'Scottish Premiership', 'country': 'Scotland', 'priority': 3},
-            'NORWAY': {'name': 'Eliteserien', 'country': 'Norway', 'priority': 3},
-            'SWITZERLAND': {'name': 'Super League', 'country': 'Switzerland', 'priority': 3},
-            'CROATIA': {'name': 'HNL', 'country': 'Croatia', 'priority': 3},
-            'SERBIA': {'name': 'SuperLiga', 'country': 'Serbia', 'priority': 3},
-            'UKRAINE': {'name': 'Premier League', 'country': 'Ukraine', 'priority': 3},
-            'BULGARIA': {'name': 'First League', 'country': 'Bulgaria', 'priority': 3},
-            'JLEAGUE': {'name': 'J-League', 'country': 'Japan', 'priority': 3},
-            'KLEAGUE': {'name': 'K-League', 'country': 'South Korea', 'priority': 3},
-            'CSL': {'name': 'Chinese Super League', 'country': 'China', 'priority': 3},
-            'AUSTRALIAN': {'name': 'A-League', 'country': 'Australia', 'priority': 3},
-            'CHILE': {'name': 'Primera División', 'country': 'Chile', 'priority': 3},
-            'COLOMBIA': {'name': 'Liga BetPlay', 'country': 'Colombia', 'priority': 3},
-            'ECUADOR': {'name': 'Serie A', 'country': 'Ecuador', 'priority': 3},
-            'PERU': {'name': 'Liga 1', 'country': 'Peru', 'priority': 3},
-            'URUGUAY': {'name': 'Primera División', 'country': 'Uruguay', 'priority': 3},
-            'VENEZUELA': {'name': 'Primera División', 'country': 'Venezuela', 'priority': 3},
-            'BOLIVIA': {'name': 'Liga de Fútbol Profesional', 'country': 'Bolivia', 'priority': 3},
-            'PARAGUAY': {'name': 'Primera División', 'country': 'Paraguay', 'priority': 3},
-            'MOROCCO': {'name': 'Botola', 'country': 'Morocco', 'priority': 3},
-            'EGYPT': {'name': 'Premier League', 'country': 'Egypt', 'priority': 3},
-            'SOUTH_AFRICA': {'name': 'Premier Division', 'country': 'South Africa', 'priority': 3},
-            'TUNISIA': {'name': 'Ligue Professionnelle 1', 'country': 'Tunisia', 'priority': 3},
-            'ALGERIA': {'name': 'Ligue Professionnelle 1', 'country': 'Algeria', 'priority': 3},
-            'GHANA': {'name': 'Premier League', 'country': 'Ghana', 'priority': 3},
-            'NIGERIA': {'name': 'Professional Football League', 'country': 'Nigeria', 'priority': 3},
-            'INDIA': {'name': 'Indian Super League', 'country': 'India', 'priority': 3},
-            'THAILAND': {'name': 'Thai League 1', 'country': 'Thailand', 'priority': 3},
-            'MALAYSIA': {'name': 'Super League', 'country': 'Malaysia', 'priority': 3},
-            'SINGAPORE': {'name': 'Premier League', 'country': 'Singapore', 'priority': 3},
-            'INDONESIA': {'name': 'Liga 1', 'country': 'Indonesia', 'priority': 3}
-        }
+        self.supported_leagues = SUPPORTED_LEAGUES
         
         self.proxy_list = []
         self.current_proxy_index = 0
+    
+    def _create_scrapers(self, session: Optional[aiohttp.ClientSession] = None):
+        """Scraper'ları oluştur; session verilirse hepsi aynı bağlantı havuzunu kullanır"""
+        return {
+            'understat': UnderstatScraper(self.db, session),
+            'sofascore': SofascoreScraper(self.db, session),
+            'flashscore': FlashscoreScraper(self.db, session)
+        }
+    
+    async def startup(self):
+        """Tüm scraper'ların paylaşacağı uzun ömürlü HTTP session'ı aç"""
+        if self.session and not self.session.closed:
+            return
         
+        connector = aiohttp.TCPConnector(
+            limit=200,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
+        self.session = aiohttp.ClientSession(
+            headers=self._base_headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+            trust_env=True
+        )
+        self.scrapers = self._create_scrapers(self.session)
+    
+    async def shutdown(self):
+        """Bekleyen logları yaz, paylaşılan HTTP session'ı ve scraper kaynaklarını kapat"""
+        await self.scrapers['flashscore'].close_driver()
+        for scraper in self.scrapers.values():
+            await scraper.close_session()
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        
+        if self._log_task:
+            await self._log_q.join()
+            self._log_task.cancel()
+            self._log_task = None
+        
+    async def ensure_indexes(self):
+        """Scraping sorgularının kullandığı index'leri oluştur
+
+        Her index ayrı denenir; biri başarısız olursa diğerleri yine oluşturulur.
+        """
+        for collection, keys, options in SCRAPER_INDEXES:
+            try:
+                await self.db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Scraping index oluşturma hatası ({collection} {keys}): {e}")
+    
     async def initialize_leagues(self):
         """Desteklenen ligleri veritabanına kaydet"""
         try:
             for league_code, info in self.supported_leagues.items():
-                existing_league = await self.db.leagues.find_one({"league_code": league_code})
+                existing_league = await self.db.leagues.find_one({"league_code": league_code}, {"_id": 1})
                 
                 if not existing_league:
                     league = League(
@@ -107,7 +222,7 @@ class ScraperManager:
                         active=True
                     )
                     
-                    await self.db.leagues.insert_one(league.dict())
+                    await self.db.leagues.insert_one(league.model_dump())
                     logger.info(f"Liga eklendi: {info['name']} ({info['country']})")
             
             logger.info(f"Toplam {len(self.supported_leagues)} liga destekleniyor")
@@ -126,7 +241,7 @@ class ScraperManager:
             started_at=datetime.utcnow()
         )
         
-        job_id = await self.db.scraping_jobs.insert_one(job.dict())
+        job_id = (await self.db.scraping_jobs.insert_one(job.model_dump())).inserted_id
         
         try:
             # 1. Ligleri başlat
@@ -134,35 +249,20 @@ class ScraperManager:
             
             # 2. Eğer league_ids belirtilmemişse, priorite sırasına göre al
             if not league_ids:
-                leagues = await self.db.leagues.find({"active": True}).to_list(1000)
+                leagues = await self.db.leagues.find({"active": True}, {"id": 1, "league_code": 1, "_id": 0}).to_list(1000)
                 # Priorite sırasına göre sırala
-                leagues.sort(key=lambda x: self.supported_leagues.get(x['league_code'], {}).get('priority', 999))
+                leagues.sort(key=lambda x: PRIORITY_BY_CODE.get(x['league_code'], 999))
                 league_ids = [league['id'] for league in leagues[:20]]  # İlk 20 ligden başla
             
-            # 3. Her scraper için veri toplama
-            total_scraped = 0
-            errors = []
+            # 3. Scraper'lar farklı sitelere gittiği için eşzamanlı çalışır
+            tasks = [
+                asyncio.create_task(self._run_one_scraper(scraper_name, scraper, league_ids))
+                for scraper_name, scraper in self.scrapers.items()
+            ]
+            results = await asyncio.gather(*tasks)
             
-            for scraper_name, scraper in self.scrapers.items():
-                try:
-                    logger.info(f"🔄 {scraper_name} ile veri toplama başladı...")
-                    
-                    # Teams ve matches'i scrape et
-                    teams_scraped = await scraper.scrape_teams(league_ids)
-                    matches_scraped = await scraper.scrape_matches(league_ids)
-                    
-                    total_scraped += teams_scraped + matches_scraped
-                    
-                    logger.info(f"✅ {scraper_name}: {teams_scraped} takım, {matches_scraped} maç")
-                    
-                    # Scrapers arasında bekleme
-                    await asyncio.sleep(random.uniform(5, 15))
-                    
-                except Exception as e:
-                    error_msg = f"{scraper_name} scraper hatası: {e}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                    await self.log_error("scraper_manager", error_msg)
+            total_scraped = sum(teams + matches for teams, matches, _ in results)
+            errors = [error for _, _, scraper_errors in results for error in scraper_errors]
             
             # 4. Job'u tamamla
             await self.db.scraping_jobs.update_one(
@@ -192,6 +292,31 @@ class ScraperManager:
                 }
             )
             await self.log_error("scraper_manager", f"Scraping job hatası: {e}")
+        finally:
+            # WebDriver teams ve matches boyunca açık kalır, iş bitince kapatılır
+            await self.scrapers['flashscore'].close_driver()
+            for scraper in self.scrapers.values():
+                await scraper.close_session()
+            if self.on_job_complete:
+                self.on_job_complete()
+    
+    async def _run_one_scraper(self, scraper_name: str, scraper, league_ids: List[str]):
+        """Tek scraper ile takım ve maçları çek -> (takım, maç, hatalar)"""
+        try:
+            logger.info(f"🔄 {scraper_name} ile veri toplama başladı...")
+            
+            # Teams ve matches'i scrape et
+            teams_scraped = await scraper.scrape_teams(league_ids)
+            matches_scraped = await scraper.scrape_matches(league_ids)
+            
+            logger.info(f"✅ {scraper_name}: {teams_scraped} takım, {matches_scraped} maç")
+            return teams_scraped, matches_scraped, []
+            
+        except Exception as e:
+            error_msg = f"{scraper_name} scraper hatası: {e}"
+            logger.error(error_msg)
+            await self.log_error("scraper_manager", error_msg)
+            return 0, 0, [error_msg]
     
     async def get_proxy(self):
         """Proxy rotasyonu"""
@@ -206,62 +331,66 @@ class ScraperManager:
         
         return proxy
     
-    async def get_session(self, use_proxy: bool = True):
-        """HTTP session oluştur"""
-        headers = {
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
+    async def safe_request(self, url: str, max_retries: int = 3):
+        """Güvenli HTTP request"""
+        if self.session is None or self.session.closed:
+            await self.startup()
         
-        connector = aiohttp.TCPConnector(limit=100, limit_per_host=10)
-        timeout = aiohttp.ClientTimeout(total=30)
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(max_retries),
+                wait=_retry_wait,
+                retry=retry_if_exception(_is_transient),
+                reraise=True
+            ):
+                with attempt:
+                    async with self.session.get(
+                        url,
+                        headers={'User-Agent': random.choice(self._ua_pool)},
+                        proxy=await self.get_proxy()
+                    ) as response:
+                        # 429/5xx yeniden denenir (bekleme Retry-After'dan), diğer 4xx hemen None döner
+                        response.raise_for_status()
+                        return await response.text()
         
-        if use_proxy:
-            proxy = await self.get_proxy()
-            if proxy:
-                return aiohttp.ClientSession(
-                    headers=headers,
-                    connector=connector,
-                    timeout=timeout,
-                    trust_env=True,
-                    proxy=proxy
-                )
+        except aiohttp.ClientResponseError as e:
+            logger.warning(f"HTTP {e.status} for {url}")
+            return None
         
-        return aiohttp.ClientSession(
-            headers=headers,
-            connector=connector,
-            timeout=timeout,
-            trust_env=True
-        )
+        except Exception as e:
+            logger.error(f"Request failed for {url} after {max_retries} attempts: {e}")
+            raise
     
-    async def safe_request(self, url: str, max_retries: int = 3):
-        """Güvenli HTTP request"""
-        for attempt in range(max_retries):
+    def _enqueue_log(self, log_entry: SystemLog):
+        """Log kaydını kuyruğa at; yazıcı task yoksa başlat"""
+        if self._log_task is None or self._log_task.done():
+            self._log_task = asyncio.create_task(self._log_flusher())
+        self._log_q.put_nowait(log_entry.model_dump())
+    
+    async def _log_flusher(self):
+        """Kuyruktaki logları LOG_BATCH_SIZE'lık ya da LOG_FLUSH_INTERVAL'lık partilerle yaz"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._log_q.get()]
+            deadline = loop.time() + LOG_FLUSH_INTERVAL
+            
+            while len(batch) < LOG_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._log_q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
             try:
-                async with await self.get_session() as session:
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            return await response.text()
-                        elif response.status == 429:
-                            # Rate limit - bekle ve tekrar dene
-                            await asyncio.sleep(random.uniform(10, 30))
-                            continue
-                        else:
-                            logger.warning(f"HTTP {response.status} for {url}")
-                            
+                await self.db.system_logs.insert_many(batch, ordered=False)
             except Exception as e:
-                logger.error(f"Request attempt {attempt + 1} failed for {url}: {e}")
-                
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(random.uniform(2, 8))
-                else:
-                    raise e
-        
-        return None
+                logger.error(f"SystemLog yazılamadı ({len(batch)} kayıt): {e}")
+            finally:
+                for _ in batch:
+                    self._log_q.task_done()
     
     async def log_error(self, module: str, message: str, details: Dict[str, Any] = None):
         """Hata logla"""
@@ -272,7 +401,7 @@ class ScraperManager:
             details=details or {}
         )
         
-        await self.db.system_logs.insert_one(log_entry.dict())
+        self._enqueue_log(log_entry)
         logger.error(f"[{module}] {message}")
     
     async def log_info(self, module: str, message: str, details: Dict[str, Any] = None):
@@ -284,7 +413,7 @@ class ScraperManager:
             details=details or {}
         )
         
-        await self.db.system_logs.insert_one(log_entry.dict())
+        self._enqueue_log(log_entry)
         logger.info(f"[{module}] {message}")
     
     async def get_scraping_stats(self):
@@ -293,16 +422,29 @@ class ScraperManager:
             # Son 24 saatteki joblar
             since = datetime.utcnow() - timedelta(hours=24)
             
-            jobs = await self.db.scraping_jobs.find({
-                "created_at": {"$gte": since}
-            }).to_list(1000)
+            # Sayımlar Mongo'da yapılır; tek, sabit boyutlu sonuç döner
+            result = await self.db.scraping_jobs.aggregate([
+                {"$match": {"created_at": {"$gte": since}}},
+                {"$facet": {
+                    "by_status": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+                    "totals": [{"$group": {
+                        "_id": None,
+                        "items": {"$sum": "$items_scraped"},
+                        "total": {"$sum": 1}
+                    }}]
+                }}
+            ]).to_list(1)
+            
+            facets = result[0] if result else {"by_status": [], "totals": []}
+            by_status = {row["_id"]: row["n"] for row in facets["by_status"]}
+            totals = facets["totals"][0] if facets["totals"] else {"items": 0, "total": 0}
             
             stats = {
-                "total_jobs": len(jobs),
-                "completed_jobs": len([j for j in jobs if j["status"] == "completed"]),
-                "failed_jobs": len([j for j in jobs if j["status"] == "failed"]),
-                "running_jobs": len([j for j in jobs if j["status"] == "running"]),
-                "total_items_scraped": sum(j.get("items_scraped", 0) for j in jobs),
+                "total_jobs": totals["total"],
+                "completed_jobs": by_status.get("completed", 0),
+                "failed_jobs": by_status.get("failed", 0),
+                "running_jobs": by_status.get("running", 0),
+                "total_items_scraped": totals["items"],
                 "timestamp": datetime.utcnow()
             }
             
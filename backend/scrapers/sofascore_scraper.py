@@ -1,21 +1,50 @@
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime, timedelta
-import json
+import orjson
+import random
+from types import MappingProxyType
 import aiohttp
-from fake_useragent import UserAgent
+from pymongo import UpdateOne
 
 from models.database_models import League, Team, Match, TeamStats
+from scrapers.http_cache import cached_get, ttl_for_date, TTL_DAY
+from scrapers.mongo_writes import existing_match_keys, insert_new_docs
 
 logger = logging.getLogger(__name__)
 
+# Scraping döngüleri liga belgesinden yalnızca bu alanları kullanır
+LEAGUE_PROJECTION = {"id": 1, "league_code": 1, "country": 1, "season": 1, "_id": 0}
+# 60 günlük maç taramasında aynı anda en fazla bu kadar gün isteği
+DAY_CONCURRENCY = 5
+# Bugünden 30 gün önce başlayıp 30 gün sonrasına kadar (dahil) taranan gün sayısı
+MATCH_WINDOW_DAYS = 61
+# Aynı anda işlenen lig sayısı; host limiter'ı ile birlikte sağlayıcıyı yormamak için düşük tutulur
+MAX_CONCURRENT_LEAGUES = 3
+# Eksik alt nesneler için paylaşılan salt-okunur boş sözlük
+EMPTY = MappingProxyType({})
+
 class SofascoreScraper:
-    def __init__(self, db):
+    # fake_useragent veritabanı indirmeden seçilen sabit Chrome UA'ları
+    _UA_POOL = (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36'
+    )
+    
+    def __init__(self, db, session: Optional[aiohttp.ClientSession] = None):
         self.db = db
+        # ScraperManager'ın paylaşılan session'ı verilirse onu kullan, kapatma
+        self.session = session
+        self._owns_session = session is None
+        # Bir scraping çalışması boyunca turnuva -> sezon ID'si
+        self._season_cache: Dict[int, int] = {}
+        self.league_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LEAGUES)
         self.base_url = "https://api.sofascore.com/api/v1"
         self.headers = {
-            'User-Agent': UserAgent().chrome,
+            'User-Agent': random.choice(self._UA_POOL),
             'Accept': 'application/json',
             'Accept-Language': 'en-US,en;q=0.9',
             'Referer': 'https://www.sofascore.com/',
@@ -41,277 +70,342 @@ class SofascoreScraper:
             'LIGA_MX': 352
         }
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """HTTP session; dışarıdan verilmediyse kendi session'ını aç"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=30, ttl_dns_cache=300)
+            )
+            self._owns_session = True
+        return self.session
+    
+    async def close_session(self):
+        """Kendi açtığı HTTP session'ı kapat; paylaşılan session'a dokunma"""
+        if not self._owns_session:
+            return
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_session()
+    
     async def scrape_teams(self, league_ids: List[str]) -> int:
         """Takım verilerini çek"""
         teams_scraped = 0
+        # Yeni çalışma: sezon ID'leri yeniden sorulur
+        self._season_cache.clear()
         
         try:
-            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}).to_list(1000)
+            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}, LEAGUE_PROJECTION).to_list(len(league_ids))
             
-            for league in leagues:
-                league_code = league['league_code']
-                
-                if league_code not in self.tournament_mapping:
-                    logger.warning(f"SofaScore'da desteklenmeyen lig: {league_code}")
-                    continue
-                
-                tournament_id = self.tournament_mapping[league_code]
-                season_id = await self._get_current_season_id(tournament_id)
-                
-                if not season_id:
-                    logger.warning(f"SofaScore'da sezon bulunamadı: {league_code}")
-                    continue
-                
-                try:
-                    # Takım verilerini çek
-                    teams = await self._fetch_teams_data(tournament_id, season_id)
-                    
-                    for team_data in teams:
-                        # Takım var mı kontrol et
-                        existing_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "external_ids.sofascore": str(team_data['id'])
-                        })
-                        
-                        if not existing_team:
-                            team = Team(
-                                name=team_data['name'],
-                                league_id=league['id'],
-                                country=league['country'],
-                                external_ids={"sofascore": str(team_data['id'])},
-                                alternative_names=team_data.get('alternative_names', [])
-                            )
-                            
-                            await self.db.teams.insert_one(team.dict())
-                            teams_scraped += 1
-                            logger.info(f"Takım eklendi (SofaScore): {team_data['name']}")
-                        else:
-                            # Mevcut takımı güncelle
-                            await self.db.teams.update_one(
-                                {"_id": existing_team["_id"]},
-                                {
-                                    "$set": {
-                                        "external_ids.sofascore": str(team_data['id']),
-                                        "updated_at": datetime.utcnow()
-                                    }
-                                }
-                            )
-                    
-                    await asyncio.sleep(3)  # API rate limit
-                    
-                except Exception as e:
-                    logger.error(f"SofaScore takım çekme hatası ({league_code}): {e}")
-                    continue
+            # Ligler eşzamanlı işlenir (en fazla MAX_CONCURRENT_LEAGUES)
+            counts = await asyncio.gather(*(self._scrape_league_teams(league) for league in leagues))
+            teams_scraped = sum(counts)
         
         except Exception as e:
             logger.error(f"SofaScore takım scraping hatası: {e}")
         
         return teams_scraped
     
+    async def _scrape_league_teams(self, league: Dict[str, Any]) -> int:
+        """Bir ligin takımlarını çek ve kaydet"""
+        async with self.league_semaphore:
+            league_code = league['league_code']
+            
+            if league_code not in self.tournament_mapping:
+                logger.warning(f"SofaScore'da desteklenmeyen lig: {league_code}")
+                return 0
+            
+            tournament_id = self.tournament_mapping[league_code]
+            season_id = await self._get_current_season_id(tournament_id)
+            
+            if not season_id:
+                logger.warning(f"SofaScore'da sezon bulunamadı: {league_code}")
+                return 0
+            
+            try:
+                # Takım verilerini çek
+                teams = await self._fetch_teams_data(tournament_id, season_id)
+                
+                # Mevcut takımlar sözlükten elenir; yalnızca yeniler tek insert_many ile yazılır
+                team_index = await self._team_id_index(league['id'])
+                new_docs = []
+                for team_data in teams:
+                    sofascore_id = str(team_data['id'])
+                    if sofascore_id in team_index:
+                        continue
+                    
+                    team_doc = Team(
+                        name=team_data['name'],
+                        league_id=league['id'],
+                        country=league['country'],
+                        external_ids={"sofascore": sofascore_id},
+                        alternative_names=team_data.get('alternative_names', [])
+                    ).model_dump()
+                    team_index[sofascore_id] = team_doc
+                    new_docs.append(team_doc)
+                
+                inserted = await insert_new_docs(self.db.teams, new_docs, "SofaScore takım")
+                logger.info(f"SofaScore takımları ({league_code}): {inserted} yeni, {len(teams) - len(new_docs)} mevcut")
+                
+                return inserted
+                
+            except Exception as e:
+                logger.error(f"SofaScore takım çekme hatası ({league_code}): {e}")
+                return 0
+    
     async def scrape_matches(self, league_ids: List[str]) -> int:
         """Maç verilerini çek"""
         matches_scraped = 0
         
         try:
-            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}).to_list(1000)
+            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}, LEAGUE_PROJECTION).to_list(len(league_ids))
             
-            for league in leagues:
-                league_code = league['league_code']
-                
-                if league_code not in self.tournament_mapping:
-                    continue
-                
-                tournament_id = self.tournament_mapping[league_code]
-                season_id = await self._get_current_season_id(tournament_id)
-                
-                if not season_id:
-                    continue
-                
-                try:
-                    # Maç verilerini çek
-                    matches = await self._fetch_matches_data(tournament_id, season_id)
-                    
-                    for match_data in matches:
-                        # Takımları bul
-                        home_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "external_ids.sofascore": str(match_data['home_team_id'])
-                        })
-                        
-                        away_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "external_ids.sofascore": str(match_data['away_team_id'])
-                        })
-                        
-                        if not home_team or not away_team:
-                            logger.warning(f"Takım bulunamadı (SofaScore): {match_data}")
-                            continue
-                        
-                        # Maç var mı kontrol et
-                        existing_match = await self.db.matches.find_one({
-                            "league_id": league['id'],
-                            "home_team_id": home_team['id'],
-                            "away_team_id": away_team['id'],
-                            "match_date": match_data['match_date']
-                        })
-                        
-                        if not existing_match:
-                            match = Match(
-                                league_id=league['id'],
-                                home_team_id=home_team['id'],
-                                away_team_id=away_team['id'],
-                                match_date=match_data['match_date'],
-                                season=league['season'],
-                                home_score=match_data.get('home_score'),
-                                away_score=match_data.get('away_score'),
-                                home_shots=match_data.get('home_shots'),
-                                away_shots=match_data.get('away_shots'),
-                                home_shots_on_target=match_data.get('home_shots_on_target'),
-                                away_shots_on_target=match_data.get('away_shots_on_target'),
-                                home_corners=match_data.get('home_corners'),
-                                away_corners=match_data.get('away_corners'),
-                                status=match_data.get('status', 'scheduled'),
-                                external_ids={"sofascore": str(match_data['id'])}
-                            )
-                            
-                            await self.db.matches.insert_one(match.dict())
-                            matches_scraped += 1
-                            logger.info(f"Maç eklendi (SofaScore): {home_team['name']} vs {away_team['name']}")
-                        else:
-                            # Mevcut maçı güncelle
-                            update_data = {
-                                "home_score": match_data.get('home_score'),
-                                "away_score": match_data.get('away_score'),
-                                "home_shots": match_data.get('home_shots'),
-                                "away_shots": match_data.get('away_shots'),
-                                "home_shots_on_target": match_data.get('home_shots_on_target'),
-                                "away_shots_on_target": match_data.get('away_shots_on_target'),
-                                "home_corners": match_data.get('home_corners'),
-                                "away_corners": match_data.get('away_corners'),
-                                "status": match_data.get('status', 'scheduled'),
-                                "updated_at": datetime.utcnow()
-                            }
-                            
-                            await self.db.matches.update_one(
-                                {"_id": existing_match["_id"]},
-                                {"$set": update_data}
-                            )
-                    
-                    await asyncio.sleep(3)
-                    
-                except Exception as e:
-                    logger.error(f"SofaScore maç çekme hatası ({league_code}): {e}")
-                    continue
+            # Günlük maç listesi tüm turnuvaları içerir; gün penceresi tüm ligler için bir kez çekilir
+            tournament_ids = {
+                self.tournament_mapping[league['league_code']]
+                for league in leagues if league['league_code'] in self.tournament_mapping
+            }
+            matches_by_tournament = await self._fetch_matches_data(tournament_ids) if tournament_ids else {}
+            
+            # Ligler eşzamanlı işlenir (en fazla MAX_CONCURRENT_LEAGUES)
+            counts = await asyncio.gather(*(
+                self._scrape_league_matches(league, matches_by_tournament) for league in leagues
+            ))
+            matches_scraped = sum(counts)
         
         except Exception as e:
             logger.error(f"SofaScore maç scraping hatası: {e}")
         
         return matches_scraped
     
+    async def _scrape_league_matches(self, league: Dict[str, Any],
+                                     matches_by_tournament: Dict[int, List[Dict[str, Any]]]) -> int:
+        """Bir ligin önceden çekilmiş maçlarını kaydet"""
+        async with self.league_semaphore:
+            league_code = league['league_code']
+            
+            if league_code not in self.tournament_mapping:
+                return 0
+            
+            try:
+                matches = matches_by_tournament.get(self.tournament_mapping[league_code], [])
+                
+                # Ligin takımları ve bu tarih aralığındaki mevcut maçlar bir kez okunur
+                team_index = await self._team_id_index(league['id'])
+                existing_keys = await existing_match_keys(self.db, league['id'], matches)
+                now = datetime.utcnow()
+                new_docs = []
+                operations = []
+                # Eşleşmeyen maçlar tek tek değil, lig özetinde sayı olarak loglanır
+                missing_teams = 0
+                
+                for match_data in matches:
+                    # Takımları bul
+                    home_team = team_index.get(str(match_data['home_team_id']))
+                    away_team = team_index.get(str(match_data['away_team_id']))
+                    
+                    if not home_team or not away_team:
+                        missing_teams += 1
+                        continue
+                    
+                    key = (home_team['id'], away_team['id'], match_data['match_date'])
+                    
+                    # Güncellenen alanlar
+                    update_data = {
+                        "home_score": match_data.get('home_score'),
+                        "away_score": match_data.get('away_score'),
+                        "home_shots": match_data.get('home_shots'),
+                        "away_shots": match_data.get('away_shots'),
+                        "home_shots_on_target": match_data.get('home_shots_on_target'),
+                        "away_shots_on_target": match_data.get('away_shots_on_target'),
+                        "home_corners": match_data.get('home_corners'),
+                        "away_corners": match_data.get('away_corners'),
+                        "status": match_data.get('status', 'scheduled')
+                    }
+                    
+                    if key in existing_keys:
+                        operations.append(UpdateOne(
+                            {
+                                "league_id": league['id'],
+                                "home_team_id": key[0],
+                                "away_team_id": key[1],
+                                "match_date": key[2]
+                            },
+                            {"$set": {**update_data, "updated_at": now}}
+                        ))
+                        continue
+                    
+                    existing_keys.add(key)
+                    new_docs.append(Match(
+                        league_id=league['id'],
+                        home_team_id=home_team['id'],
+                        away_team_id=away_team['id'],
+                        match_date=match_data['match_date'],
+                        season=league['season'],
+                        external_ids={"sofascore": str(match_data['id'])},
+                        **update_data
+                    ).model_dump())
+                
+                inserted = await insert_new_docs(self.db.matches, new_docs, "SofaScore maç")
+                if operations:
+                    await self.db.matches.bulk_write(operations, ordered=False)
+                logger.info(f"SofaScore maçları ({league_code}): {inserted} yeni, {len(operations)} güncellendi, {missing_teams} takımı bulunamadı")
+                
+                return inserted
+                
+            except Exception as e:
+                logger.error(f"SofaScore maç çekme hatası ({league_code}): {e}")
+                return 0
+    
     async def _get_current_season_id(self, tournament_id: int) -> Optional[int]:
         """Mevcut sezon ID'sini al"""
+        if tournament_id in self._season_cache:
+            return self._season_cache[tournament_id]
+        
         try:
             url = f"{self.base_url}/tournament/{tournament_id}/seasons"
             
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        seasons = data.get('seasons', [])
-                        
-                        # En son sezonu al
-                        if seasons:
-                            return seasons[0]['id']
-                    else:
-                        logger.error(f"SofaScore seasons request failed: {response.status}")
+            session = await self._get_session()
+            status, body = await cached_get(self.db, session, url, TTL_DAY, self.headers)
+            if status == 200:
+                data = orjson.loads(body)
+                seasons = data.get('seasons', [])
+                
+                # En son sezonu al
+                if seasons:
+                    self._season_cache[tournament_id] = seasons[0]['id']
+                    return seasons[0]['id']
+            else:
+                logger.error(f"SofaScore seasons request failed: {status}")
         
         except Exception as e:
             logger.error(f"SofaScore season ID fetch hatası: {e}")
         
         return None
     
+    async def _team_id_index(self, league_id: str) -> Dict[str, Dict[str, Any]]:
+        """Ligin takımlarını SofaScore ID'sine göre indeksle"""
+        teams = await self.db.teams.find(
+            {"league_id": league_id, "external_ids.sofascore": {"$exists": True}},
+            {"id": 1, "external_ids": 1, "_id": 0}
+        ).to_list(10000)
+        return {team['external_ids']['sofascore']: team for team in teams}
+    
     async def _fetch_teams_data(self, tournament_id: int, season_id: int) -> List[Dict[str, Any]]:
         """Takım verilerini API'den çek"""
         try:
             url = f"{self.base_url}/tournament/{tournament_id}/season/{season_id}/standings/total"
             
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        standings = data.get('standings', [])
-                        
-                        teams = []
-                        for group in standings:
-                            for row in group.get('rows', []):
-                                team = row.get('team', {})
-                                teams.append({
-                                    'id': team.get('id'),
-                                    'name': team.get('name'),
-                                    'alternative_names': [team.get('name'), team.get('shortName', '')]
-                                })
-                        
-                        return teams
-                    else:
-                        logger.error(f"SofaScore teams request failed: {response.status}")
-                        return []
+            session = await self._get_session()
+            status, body = await cached_get(self.db, session, url, TTL_DAY, self.headers)
+            if status == 200:
+                data = orjson.loads(body)
+                standings = data.get('standings', [])
+                
+                teams = []
+                for group in standings:
+                    for row in group.get('rows', []):
+                        team = row.get('team', {})
+                        teams.append({
+                            'id': team.get('id'),
+                            'name': team.get('name'),
+                            'alternative_names': [team.get('name'), team.get('shortName', '')]
+                        })
+                
+                return teams
+            else:
+                logger.error(f"SofaScore teams request failed: {status}")
+                return []
         
         except Exception as e:
             logger.error(f"SofaScore teams fetch hatası: {e}")
             return []
     
-    async def _fetch_matches_data(self, tournament_id: int, season_id: int) -> List[Dict[str, Any]]:
-        """Maç verilerini API'den çek"""
-        matches = []
+    async def _fetch_matches_data(self, tournament_ids: Set[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Maç verilerini API'den çek -> turnuva ID'si -> maçlar"""
+        matches: Dict[int, List[Dict[str, Any]]] = {tournament_id: [] for tournament_id in tournament_ids}
         
         try:
-            # Son 30 gün ve gelecek 30 gün
+            # Son 30 gün ve gelecek 30 gün; günler eşzamanlı, en fazla DAY_CONCURRENCY istek
             start_date = datetime.utcnow() - timedelta(days=30)
-            end_date = datetime.utcnow() + timedelta(days=30)
+            dates = [start_date + timedelta(days=i) for i in range(MATCH_WINDOW_DAYS)]
             
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime('%Y-%m-%d')
-                url = f"{self.base_url}/tournament/{tournament_id}/season/{season_id}/events/round/1"
-                
-                async with aiohttp.ClientSession(headers=self.headers) as session:
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            events = data.get('events', [])
-                            
-                            for event in events:
-                                if event.get('tournament', {}).get('id') == tournament_id:
-                                    match_data = self._parse_match_data(event)
-                                    if match_data:
-                                        matches.append(match_data)
-                        
-                        await asyncio.sleep(1)  # Rate limiting
-                
-                current_date += timedelta(days=1)
+            session = await self._get_session()
+            sem = asyncio.Semaphore(DAY_CONCURRENCY)
+            results = await asyncio.gather(
+                *(self._fetch_day(sem, session, tournament_ids, date) for date in dates),
+                return_exceptions=True
+            )
+            
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"SofaScore gün çekme hatası: {result}")
+                    continue
+                for tournament_id, match_data in result:
+                    matches[tournament_id].append(match_data)
         
         except Exception as e:
             logger.error(f"SofaScore matches fetch hatası: {e}")
         
         return matches
     
+    async def _fetch_day(self, sem: asyncio.Semaphore, session: aiohttp.ClientSession,
+                         tournament_ids: Set[int], date: datetime) -> List[Tuple[int, Dict[str, Any]]]:
+        """Bir günün maçlarından istenen turnuvalara ait olanları (turnuva ID'si, maç) olarak çek"""
+        date_str = date.date().isoformat()
+        url = f"{self.base_url}/sport/football/scheduled-events/{date_str}"
+        
+        async with sem:
+            # Bitmiş günler uzun, bugün ve sonrası kısa süre önbellekte kalır
+            status, body = await cached_get(self.db, session, url, ttl_for_date(date), self.headers)
+        
+        if status != 200:
+            logger.warning(f"SofaScore events request failed ({date_str}): {status}")
+            return []
+        data = orjson.loads(body)
+        
+        matches = []
+        for event in data.get('events', []):
+            tournament = event.get('tournament') or EMPTY
+            unique_id = (tournament.get('uniqueTournament') or EMPTY).get('id')
+            tournament_id = unique_id if unique_id in tournament_ids else tournament.get('id')
+            if tournament_id in tournament_ids:
+                match_data = self._parse_match_data(event)
+                if match_data:
+                    matches.append((tournament_id, match_data))
+        
+        return matches
+    
     def _parse_match_data(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Maç verisini parse et"""
         try:
+            # Alt sözlükler bir kez okunur; eksik/None olanlar için tek boş sözlük kullanılır
+            home_team = event.get('homeTeam') or EMPTY
+            away_team = event.get('awayTeam') or EMPTY
+            home_score = event.get('homeScore') or EMPTY
+            away_score = event.get('awayScore') or EMPTY
+            stats = event.get('statistics') or EMPTY
+            
             return {
                 'id': event.get('id'),
-                'home_team_id': event.get('homeTeam', {}).get('id'),
-                'away_team_id': event.get('awayTeam', {}).get('id'),
+                'home_team_id': home_team.get('id'),
+                'away_team_id': away_team.get('id'),
                 'match_date': datetime.fromtimestamp(event.get('startTimestamp', 0)),
-                'home_score': event.get('homeScore', {}).get('current'),
-                'away_score': event.get('awayScore', {}).get('current'),
-                'status': event.get('status', {}).get('type', 'scheduled'),
-                'home_shots': event.get('statistics', {}).get('homeShots'),
-                'away_shots': event.get('statistics', {}).get('awayShots'),
-                'home_shots_on_target': event.get('statistics', {}).get('homeShotsOnTarget'),
-                'away_shots_on_target': event.get('statistics', {}).get('awayShotsOnTarget'),
-                'home_corners': event.get('statistics', {}).get('homeCorners'),
-                'away_corners': event.get('statistics', {}).get('awayCorners')
+                'home_score': home_score.get('current'),
+                'away_score': away_score.get('current'),
+                'status': (event.get('status') or EMPTY).get('type', 'scheduled'),
+                'home_shots': stats.get('homeShots'),
+                'away_shots': stats.get('awayShots'),
+                'home_shots_on_target': stats.get('homeShotsOnTarget'),
+                'away_shots_on_target': stats.get('awayShotsOnTarget'),
+                'home_corners': stats.get('homeCorners'),
+                'away_corners': stats.get('awayCorners')
             }
         except Exception as e:
             logger.error(f"SofaScore match parse hatası: {e}")
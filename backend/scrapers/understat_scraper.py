@@ -2,19 +2,36 @@ import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-import json
+import orjson
 import re
 from bs4 import BeautifulSoup
 import aiohttp
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz
+from pymongo import UpdateOne
 
 from models.database_models import League, Team, Match, TeamStats
+from scrapers.http_cache import cached_get, TTL_HOUR
+from scrapers.mongo_writes import existing_match_keys, insert_new_docs
 
 logger = logging.getLogger(__name__)
 
+# Scraping döngüleri liga belgesinden yalnızca bu alanları kullanır
+LEAGUE_PROJECTION = {"id": 1, "league_code": 1, "country": 1, "season": 1, "_id": 0}
+
+# Sayfadaki gömülü JSON'lar ham byte üzerinde aranır; yalnızca eşleşen kısım çözülür
+TEAMS_DATA_RE = re.compile(rb"var teamsData\s*=\s*JSON\.parse\('(.*?)'\);", re.DOTALL)
+DATES_DATA_RE = re.compile(rb"var datesData\s*=\s*JSON\.parse\('(.*?)'\);", re.DOTALL)
+TEAM_HREF_RE = re.compile(r'/team/')
+# Aynı anda işlenen lig sayısı; host limiter'ı ile birlikte sağlayıcıyı yormamak için düşük tutulur
+MAX_CONCURRENT_LEAGUES = 3
+
 class UnderstatScraper:
-    def __init__(self, db):
+    def __init__(self, db, session: Optional[aiohttp.ClientSession] = None):
         self.db = db
+        # ScraperManager'ın paylaşılan session'ı verilirse onu kullan, kapatma
+        self.session = session
+        self._owns_session = session is None
+        self.league_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LEAGUES)
         self.base_url = "https://understat.com"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -30,179 +47,224 @@ class UnderstatScraper:
             'SUPERLIG': 'rfpl'  # Rus ligi yerine Türk ligi için sonra düzenlenebilir
         }
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """HTTP session; dışarıdan verilmediyse kendi session'ını aç"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=30, ttl_dns_cache=300)
+            )
+            self._owns_session = True
+        return self.session
+    
+    async def close_session(self):
+        """Kendi açtığı HTTP session'ı kapat; paylaşılan session'a dokunma"""
+        if not self._owns_session:
+            return
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_session()
+    
     async def scrape_teams(self, league_ids: List[str]) -> int:
         """Takım verilerini çek"""
         teams_scraped = 0
         
         try:
             # League ID'leri league_code'lara çevir
-            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}).to_list(1000)
+            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}, LEAGUE_PROJECTION).to_list(len(league_ids))
             
-            for league in leagues:
-                league_code = league['league_code']
-                
-                if league_code not in self.league_mapping:
-                    logger.warning(f"Understat'da desteklenmeyen lig: {league_code}")
-                    continue
-                
-                understat_league = self.league_mapping[league_code]
-                
-                try:
-                    # Takım verilerini çek
-                    teams = await self._fetch_teams_data(understat_league)
-                    
-                    for team_data in teams:
-                        # Takım var mı kontrol et
-                        existing_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "name": team_data['name']
-                        })
-                        
-                        if not existing_team:
-                            team = Team(
-                                name=team_data['name'],
-                                league_id=league['id'],
-                                country=league['country'],
-                                external_ids={"understat": str(team_data['id'])},
-                                alternative_names=team_data.get('alternative_names', [])
-                            )
-                            
-                            await self.db.teams.insert_one(team.dict())
-                            teams_scraped += 1
-                            logger.info(f"Takım eklendi: {team_data['name']}")
-                        else:
-                            # Mevcut takımı güncelle
-                            await self.db.teams.update_one(
-                                {"_id": existing_team["_id"]},
-                                {
-                                    "$set": {
-                                        "external_ids.understat": str(team_data['id']),
-                                        "updated_at": datetime.utcnow()
-                                    }
-                                }
-                            )
-                    
-                    # Takım istatistiklerini güncelle
-                    await self._update_team_stats(league['id'], understat_league)
-                    
-                    # Request'ler arası bekleme
-                    await asyncio.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"Understat takım çekme hatası ({league_code}): {e}")
-                    continue
+            # Ligler eşzamanlı işlenir (en fazla MAX_CONCURRENT_LEAGUES)
+            counts = await asyncio.gather(*(self._scrape_league_teams(league) for league in leagues))
+            teams_scraped = sum(counts)
         
         except Exception as e:
             logger.error(f"Understat takım scraping hatası: {e}")
         
         return teams_scraped
     
+    async def _scrape_league_teams(self, league: Dict[str, Any]) -> int:
+        """Bir ligin takımlarını çek ve kaydet"""
+        async with self.league_semaphore:
+            league_code = league['league_code']
+            
+            if league_code not in self.league_mapping:
+                logger.warning(f"Understat'da desteklenmeyen lig: {league_code}")
+                return 0
+            
+            understat_league = self.league_mapping[league_code]
+            
+            try:
+                # Takım verilerini çek
+                teams = await self._fetch_teams_data(understat_league)
+                
+                # Mevcut takımlar isimle bulunur: yalnızca Understat ID'si eksik/farklı olanlar güncellenir,
+                # yeni takımlar tek insert_many ile yazılır
+                existing = await self.db.teams.find(
+                    {"league_id": league['id']},
+                    {"id": 1, "name": 1, "external_ids": 1, "_id": 0}
+                ).to_list(10000)
+                name_index = {team['name']: team for team in existing}
+                new_docs = []
+                operations = []
+                
+                for team_data in teams:
+                    understat_id = str(team_data['id'])
+                    team = name_index.get(team_data['name'])
+                    
+                    if team:
+                        if team.get('external_ids', {}).get('understat') != understat_id:
+                            operations.append(UpdateOne(
+                                {"id": team['id']},
+                                {"$set": {"external_ids.understat": understat_id}}
+                            ))
+                        continue
+                    
+                    team_doc = Team(
+                        name=team_data['name'],
+                        league_id=league['id'],
+                        country=league['country'],
+                        external_ids={"understat": understat_id},
+                        alternative_names=team_data.get('alternative_names', [])
+                    ).model_dump()
+                    name_index[team_data['name']] = team_doc
+                    new_docs.append(team_doc)
+                
+                inserted = await insert_new_docs(self.db.teams, new_docs, "Understat takım")
+                if operations:
+                    await self.db.teams.bulk_write(operations, ordered=False)
+                logger.info(f"Understat takımları ({league_code}): {inserted} yeni, {len(teams) - len(new_docs)} mevcut")
+                
+                # Takım istatistiklerini güncelle
+                await self._update_team_stats(league['id'], understat_league)
+                
+                return inserted
+                
+            except Exception as e:
+                logger.error(f"Understat takım çekme hatası ({league_code}): {e}")
+                return 0
+    
     async def scrape_matches(self, league_ids: List[str]) -> int:
         """Maç verilerini çek"""
         matches_scraped = 0
         
         try:
-            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}).to_list(1000)
+            leagues = await self.db.leagues.find({"id": {"$in": league_ids}}, LEAGUE_PROJECTION).to_list(len(league_ids))
             
-            for league in leagues:
-                league_code = league['league_code']
-                
-                if league_code not in self.league_mapping:
-                    continue
-                
-                understat_league = self.league_mapping[league_code]
-                
-                try:
-                    # Maç verilerini çek
-                    matches = await self._fetch_matches_data(understat_league)
-                    
-                    for match_data in matches:
-                        # Takımları bul
-                        home_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "external_ids.understat": str(match_data['home_team_id'])
-                        })
-                        
-                        away_team = await self.db.teams.find_one({
-                            "league_id": league['id'],
-                            "external_ids.understat": str(match_data['away_team_id'])
-                        })
-                        
-                        if not home_team or not away_team:
-                            logger.warning(f"Takım bulunamadı: {match_data}")
-                            continue
-                        
-                        # Maç var mı kontrol et
-                        existing_match = await self.db.matches.find_one({
-                            "league_id": league['id'],
-                            "home_team_id": home_team['id'],
-                            "away_team_id": away_team['id'],
-                            "match_date": match_data['match_date']
-                        })
-                        
-                        if not existing_match:
-                            match = Match(
-                                league_id=league['id'],
-                                home_team_id=home_team['id'],
-                                away_team_id=away_team['id'],
-                                match_date=match_data['match_date'],
-                                season=league['season'],
-                                gameweek=match_data.get('gameweek'),
-                                home_score=match_data.get('home_score'),
-                                away_score=match_data.get('away_score'),
-                                home_xg=match_data.get('home_xg'),
-                                away_xg=match_data.get('away_xg'),
-                                status=match_data.get('status', 'scheduled'),
-                                external_ids={"understat": str(match_data['id'])}
-                            )
-                            
-                            await self.db.matches.insert_one(match.dict())
-                            matches_scraped += 1
-                            logger.info(f"Maç eklendi: {home_team['name']} vs {away_team['name']}")
-                        else:
-                            # Mevcut maçı güncelle
-                            update_data = {
-                                "home_score": match_data.get('home_score'),
-                                "away_score": match_data.get('away_score'),
-                                "home_xg": match_data.get('home_xg'),
-                                "away_xg": match_data.get('away_xg'),
-                                "status": match_data.get('status', 'scheduled'),
-                                "updated_at": datetime.utcnow()
-                            }
-                            
-                            await self.db.matches.update_one(
-                                {"_id": existing_match["_id"]},
-                                {"$set": update_data}
-                            )
-                    
-                    await asyncio.sleep(3)
-                    
-                except Exception as e:
-                    logger.error(f"Understat maç çekme hatası ({league_code}): {e}")
-                    continue
+            # Ligler eşzamanlı işlenir (en fazla MAX_CONCURRENT_LEAGUES)
+            counts = await asyncio.gather(*(self._scrape_league_matches(league) for league in leagues))
+            matches_scraped = sum(counts)
         
         except Exception as e:
             logger.error(f"Understat maç scraping hatası: {e}")
         
         return matches_scraped
     
+    async def _scrape_league_matches(self, league: Dict[str, Any]) -> int:
+        """Bir ligin maçlarını çek ve kaydet"""
+        async with self.league_semaphore:
+            league_code = league['league_code']
+            
+            if league_code not in self.league_mapping:
+                return 0
+            
+            understat_league = self.league_mapping[league_code]
+            
+            try:
+                # Maç verilerini çek
+                matches = await self._fetch_matches_data(understat_league)
+                
+                # Ligin takımları ve bu tarih aralığındaki mevcut maçlar bir kez okunur
+                team_index = await self._team_id_index(league['id'])
+                existing_keys = await existing_match_keys(self.db, league['id'], matches)
+                now = datetime.utcnow()
+                new_docs = []
+                operations = []
+                # Eşleşmeyen maçlar tek tek değil, lig özetinde sayı olarak loglanır
+                missing_teams = 0
+                
+                for match_data in matches:
+                    # Takımları bul
+                    home_team = team_index.get(str(match_data['home_team_id']))
+                    away_team = team_index.get(str(match_data['away_team_id']))
+                    
+                    if not home_team or not away_team:
+                        missing_teams += 1
+                        continue
+                    
+                    key = (home_team['id'], away_team['id'], match_data['match_date'])
+                    
+                    # Güncellenen alanlar
+                    update_data = {
+                        "home_score": match_data.get('home_score'),
+                        "away_score": match_data.get('away_score'),
+                        "home_xg": match_data.get('home_xg'),
+                        "away_xg": match_data.get('away_xg'),
+                        "status": match_data.get('status', 'scheduled')
+                    }
+                    
+                    if key in existing_keys:
+                        operations.append(UpdateOne(
+                            {
+                                "league_id": league['id'],
+                                "home_team_id": key[0],
+                                "away_team_id": key[1],
+                                "match_date": key[2]
+                            },
+                            {"$set": {**update_data, "updated_at": now}}
+                        ))
+                        continue
+                    
+                    existing_keys.add(key)
+                    new_docs.append(Match(
+                        league_id=league['id'],
+                        home_team_id=home_team['id'],
+                        away_team_id=away_team['id'],
+                        match_date=match_data['match_date'],
+                        season=league['season'],
+                        gameweek=match_data.get('gameweek'),
+                        external_ids={"understat": str(match_data['id'])},
+                        **update_data
+                    ).model_dump())
+                
+                inserted = await insert_new_docs(self.db.matches, new_docs, "Understat maç")
+                if operations:
+                    await self.db.matches.bulk_write(operations, ordered=False)
+                logger.info(f"Understat maçları ({league_code}): {inserted} yeni, {len(operations)} güncellendi, {missing_teams} takımı bulunamadı")
+                
+                return inserted
+                
+            except Exception as e:
+                logger.error(f"Understat maç çekme hatası ({league_code}): {e}")
+                return 0
+    
+    async def _team_id_index(self, league_id: str) -> Dict[str, Dict[str, Any]]:
+        """Ligin takımlarını Understat ID'sine göre indeksle"""
+        teams = await self.db.teams.find(
+            {"league_id": league_id, "external_ids.understat": {"$exists": True}},
+            {"id": 1, "external_ids": 1, "_id": 0}
+        ).to_list(10000)
+        return {team['external_ids']['understat']: team for team in teams}
+    
     async def _fetch_teams_data(self, league: str) -> List[Dict[str, Any]]:
         """Takım verilerini API'den çek"""
         try:
             url = f"{self.base_url}/league/{league}"
             
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # Teams data'sını JavaScript'ten çıkar
-                        teams_data = self._extract_teams_from_html(html)
-                        return teams_data
-                    else:
-                        logger.error(f"Understat teams request failed: {response.status}")
-                        return []
+            session = await self._get_session()
+            status, body = await cached_get(self.db, session, url, TTL_HOUR, self.headers)
+            if status == 200:
+                # Teams data'sını JavaScript'ten çıkar
+                teams_data = self._extract_teams_from_html(body)
+                return teams_data
+            else:
+                logger.error(f"Understat teams request failed: {status}")
+                return []
         
         except Exception as e:
             logger.error(f"Understat teams fetch hatası: {e}")
@@ -213,35 +275,31 @@ class UnderstatScraper:
         try:
             url = f"{self.base_url}/league/{league}/2024"
             
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        
-                        # Matches data'sını JavaScript'ten çıkar
-                        matches_data = self._extract_matches_from_html(html)
-                        return matches_data
-                    else:
-                        logger.error(f"Understat matches request failed: {response.status}")
-                        return []
+            session = await self._get_session()
+            status, body = await cached_get(self.db, session, url, TTL_HOUR, self.headers)
+            if status == 200:
+                # Matches data'sını JavaScript'ten çıkar
+                matches_data = self._extract_matches_from_html(body)
+                return matches_data
+            else:
+                logger.error(f"Understat matches request failed: {status}")
+                return []
         
         except Exception as e:
             logger.error(f"Understat matches fetch hatası: {e}")
             return []
     
-    def _extract_teams_from_html(self, html: str) -> List[Dict[str, Any]]:
+    def _extract_teams_from_html(self, html: bytes) -> List[Dict[str, Any]]:
         """HTML'den takım verilerini çıkar"""
         teams = []
         
         try:
             # JavaScript'teki teamsData'yı bul
-            pattern = r'var teamsData = JSON\.parse\(\'(.*?)\'\);'
-            match = re.search(pattern, html)
+            match = TEAMS_DATA_RE.search(html)
             
             if match:
-                teams_json = match.group(1)
-                teams_json = teams_json.replace('\\', '')
-                teams_data = json.loads(teams_json)
+                teams_json = match.group(1).replace(b'\\', b'')
+                teams_data = orjson.loads(teams_json)
                 
                 for team_id, team_info in teams_data.items():
                     teams.append({
@@ -252,12 +310,14 @@ class UnderstatScraper:
             
             # Eğer JavaScript'ten çıkaramazsa, HTML'den table parsing
             if not teams:
-                soup = BeautifulSoup(html, 'html.parser')
-                team_links = soup.find_all('a', href=re.compile(r'/team/'))
+                soup = BeautifulSoup(html, 'lxml')
+                team_links = soup.find_all('a', href=TEAM_HREF_RE)
+                seen = set()
                 
                 for link in team_links:
                     team_name = link.text.strip()
-                    if team_name and team_name not in [t['name'] for t in teams]:
+                    if team_name and team_name not in seen:
+                        seen.add(team_name)
                         teams.append({
                             'id': len(teams) + 1,
                             'name': team_name,
@@ -269,19 +329,17 @@ class UnderstatScraper:
         
         return teams
     
-    def _extract_matches_from_html(self, html: str) -> List[Dict[str, Any]]:
+    def _extract_matches_from_html(self, html: bytes) -> List[Dict[str, Any]]:
         """HTML'den maç verilerini çıkar"""
         matches = []
         
         try:
             # JavaScript'teki datesData'yı bul
-            pattern = r'var datesData = JSON\.parse\(\'(.*?)\'\);'
-            match = re.search(pattern, html)
+            match = DATES_DATA_RE.search(html)
             
             if match:
-                dates_json = match.group(1)
-                dates_json = dates_json.replace('\\', '')
-                dates_data = json.loads(dates_json)
+                dates_json = match.group(1).replace(b'\\', b'')
+                dates_data = orjson.loads(dates_json)
                 
                 for date_str, date_matches in dates_data.items():
                     for match_data in date_matches:
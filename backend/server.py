@@ -1,31 +1,52 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
+import time
 from datetime import datetime, timedelta
 import asyncio
 from contextlib import asynccontextmanager
+import orjson
+import redis.asyncio as aioredis
+from arq import create_pool
+from arq.connections import RedisSettings
 
 # Import our modules
 from scrapers.scraper_manager import ScraperManager
 from prediction.prediction_engine import PredictionEngine
 from models.database_models import *
 from utils.scheduler import SchedulerManager
+from utils.data_version import get_data_version
 from enhanced_data_collector import EnhancedDataCollector
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Motor her sorguyu global bir thread havuzunda çalıştırır (varsayılan CPU * 5 thread);
+# havuz, bağlantı havuzu kadar eşzamanlı sorguyu taşıyabilmeli. Motor bu değeri import
+# anında okuduğu için import .env yüklendikten sonra yapılır.
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+os.environ.setdefault('MOTOR_MAX_WORKERS', str(MONGO_MAX_POOL_SIZE))
+from motor.motor_asyncio import AsyncIOMotorClient
+
 # MongoDB connection
+# Tek bir paylaşılan client; havuz, eşzamanlı bulk işlemleri (maçlar + istatistikler +
+# tahminler gather ile) ve API isteklerini karşılayacak şekilde boyutlandırıldı
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+    maxIdleTimeMS=60000,
+    serverSelectionTimeoutMS=5000,
+    retryWrites=True
+)
 db = client[os.environ['DB_NAME']]
 
 # Global instances
@@ -33,17 +54,162 @@ scraper_manager = None
 prediction_engine = None
 scheduler_manager = None
 data_collector = None
+redis_client = None
+# REDIS_URL tanımlıysa uzun işler arq kuyruğuna atılır (bkz. worker.py)
+arq_pool = None
+# Kuyruktaki model eğitimi işinin sabit id'si (aynı anda tek eğitim)
+TRAIN_JOB_ID = "train_models"
+
+# Redis tanımlıysa pahalı endpoint yanıtları bu sürelerle paylaşımlı önbellekte tutulur
+TODAY_PREDICTIONS_CACHE_TTL = 60  # saniye
+PERFORMANCE_STATS_CACHE_TTL = 300  # saniye
+# Liste endpoint'lerinde yalnızca arayüzün kullandığı alanlar okunur
+LEAGUE_LIST_PROJECTION = {"id": 1, "name": 1, "country": 1, "season": 1, "league_code": 1, "active": 1}
+TEAM_LIST_PROJECTION = {"id": 1, "name": 1, "league_id": 1, "country": 1, "logo_url": 1, "alternative_names": 1}
+MATCH_LIST_PROJECTION = {
+    "id": 1, "league_id": 1, "home_team_id": 1, "away_team_id": 1, "match_date": 1, "season": 1,
+    "status": 1, "home_score": 1, "away_score": 1, "home_xg": 1, "away_xg": 1,
+    "odds_1x2": 1, "odds_over_under": 1, "odds_btts": 1
+}
+# Tahminlerdeki büyük model_features sözlüğü listelerde gönderilmez
+PREDICTION_LIST_PROJECTION = {"model_features": 0}
+# Takım / lig join'lerinde yalnızca isim gerekir
+NAME_PROJECTION = {"name": 1, "_id": 0}
+MATCH_ODDS_PROJECTION = {"match_date": 1, "odds_1x2": 1, "odds_over_under": 1, "odds_btts": 1, "_id": 0}
+
+# Bugünkü tahminler: en yüksek confidence'lı ilk N kayıt
+TODAY_PREDICTIONS_INDEX = [("match_date", 1), ("confidence", -1)]
+TODAY_PREDICTIONS_LIMIT = 100
+
+# /stats/performance'ta raporlanan bahis türleri
+PERFORMANCE_BET_TYPES = ["1X2", "O/U2.5", "BTTS"]
+
+# /api/leagues yanıtı (aktif ligler + sayımlar) bu süre boyunca ya da worker'daki bir iş
+# veri sürümünü artırana kadar bellekten döner
+LEAGUES_CACHE_TTL = 600  # saniye
+_leagues_cache = {"data": None, "expires": 0.0, "version": None}
+# Süresi aynı anda dolan isteklerden yalnızca biri Mongo'dan yükler
+_leagues_cache_lock = asyncio.Lock()
+
+def invalidate_leagues_cache():
+    """Lig önbelleğini geçersiz kıl; sonraki istek Mongo'dan yeniden yükler"""
+    _leagues_cache["expires"] = 0.0
+
+def _leagues_cache_stale(version: Optional[str]) -> bool:
+    """Önbellek boş, süresi dolmuş ya da veri sürümü değişmişse True (sürüm bilinmiyorsa yalnızca TTL)"""
+    if _leagues_cache["data"] is None or time.monotonic() >= _leagues_cache["expires"]:
+        return True
+    return version is not None and version != _leagues_cache["version"]
+
+async def ensure_api_indexes():
+    """API endpoint'lerinin filtre / sıralama alanları için index'leri oluştur
+
+    Diğer index'ler (teams.league_id, matches (home, away, tarih), predictions
+    (match_id, bet_type) ve (created_at, is_correct)) servislerin kendi
+    ensure_indexes metotlarında oluşturulur.
+    """
+    try:
+        await asyncio.gather(
+            db.leagues.create_index([("active", 1)]),
+            # Maç / tahmin detaylarında ve join'lerde id ile tekil okuma
+            db.matches.create_index([("id", 1)], unique=True),
+            db.predictions.create_index([("id", 1)], unique=True),
+            # Yaklaşan / son maçlar yalnızca tarih aralığıyla süzülür
+            db.matches.create_index([("match_date", 1)]),
+            # Bugünkü tahminler: tarih aralığı (sıralama bir günlük kayıt üzerinde, limitli)
+            db.predictions.create_index(TODAY_PREDICTIONS_INDEX),
+            # /api/leagues lig başına tahmin sayısı
+            db.predictions.create_index([("league_id", 1)])
+        )
+    except Exception as e:
+        logger.error(f"API index oluşturma hatası: {e}")
+
+async def enqueue_job(job_name: str, *args, **kwargs) -> bool:
+    """İşi arq kuyruğuna at; kuyruk yoksa False döner ve çağıran işi kendisi çalıştırır"""
+    if arq_pool is None:
+        return False
+    
+    await arq_pool.enqueue_job(job_name, *args, **kwargs)
+    return True
+
+async def enqueue_training(bet_types: List[str]) -> bool:
+    """Model eğitimini worker'a ver; aynı id'li eğitim işi kuyruktayken yenisi eklenmez"""
+    return await enqueue_job("train_job", bet_types, _job_id=TRAIN_JOB_ID)
+
+async def cached_response(key: str, ttl: int, loader):
+    """Yanıtı Redis'ten döndür; yoksa loader ile üretip `ttl` saniyeliğine yaz
+
+    Redis yapılandırılmamışsa ya da erişilemiyorsa doğrudan loader çalışır.
+    """
+    if redis_client is None:
+        return await loader()
+    
+    # Worker'da biten işler sürümü artırır; eski sürümün kayıtları TTL ile silinir
+    key = f"{key}:v{await get_data_version(redis_client)}"
+    
+    try:
+        raw = await redis_client.get(key)
+        if raw is not None:
+            return orjson.loads(raw)
+    except Exception as e:
+        logger.warning(f"Redis okuma hatası ({key}): {e}")
+    
+    data = await loader()
+    
+    try:
+        await redis_client.set(key, orjson.dumps(data, default=str), ex=ttl)
+    except Exception as e:
+        logger.warning(f"Redis yazma hatası ({key}): {e}")
+    
+    return data
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global scraper_manager, prediction_engine, scheduler_manager, data_collector
+    global scraper_manager, prediction_engine, scheduler_manager, data_collector, redis_client, arq_pool
+    
+    # Paylaşımlı yanıt önbelleği (opsiyonel)
+    if os.environ.get('REDIS_URL'):
+        redis_client = aioredis.from_url(os.environ['REDIS_URL'])
+        try:
+            arq_pool = await create_pool(RedisSettings.from_dsn(os.environ['REDIS_URL']))
+        except Exception as e:
+            logger.warning(f"İş kuyruğuna bağlanılamadı, işler API sürecinde çalışacak: {e}")
     
     # Initialize services
     scraper_manager = ScraperManager(db)
-    prediction_engine = PredictionEngine(db)
-    scheduler_manager = SchedulerManager(db, scraper_manager, prediction_engine)
+    # Kuyruk varsa modeller worker'daki train_job ile eğitilir; iki süreç aynı dosyaları yazmaz
+    prediction_engine = PredictionEngine(db, train_in_process=arq_pool is None)
+    scheduler_manager = SchedulerManager(db, scraper_manager, prediction_engine, enqueue_training=enqueue_training)
     data_collector = EnhancedDataCollector(db)
     
+    # Aggregation pipeline'ları MongoDB 5.2+ gerektirir; eski sunucuda açıkça başlamaz
+    await data_collector.check_server_version()
+    
+    # Index'leri oluştur
+    await data_collector.ensure_indexes()
+    await prediction_engine.ensure_indexes()
+    await scraper_manager.ensure_indexes()
+    await ensure_api_indexes()
+    
+    # Scraper'ların paylaşacağı HTTP bağlantı havuzunu aç
+    await scraper_manager.startup()
+    # Scraping sonrası ligler/sayımlar değişir
+    scraper_manager.on_job_complete = invalidate_leagues_cache
+    
+    # Lig listesini ilk istekten önce önbelleğe al
+    try:
+        await _refresh_leagues_cache(await get_data_version(redis_client))
+    except Exception as e:
+        logger.warning(f"Lig önbelleği doldurulamadı: {e}")
+    
+    # Tahmin modellerini bir kez yükle; eksikler worker'da eğitilir
+    try:
+        missing_models = await prediction_engine.initialize_models()
+        if missing_models:
+            await enqueue_training(missing_models)
+    except Exception as e:
+        logger.warning(f"Tahmin modelleri başlatılamadı: {e}")
+    
     # Start scheduler
     scheduler_manager.start()
     
@@ -53,6 +219,11 @@ async def lifespan(app: FastAPI):
     
     # Cleanup
     scheduler_manager.stop()
+    await scraper_manager.shutdown()
+    if redis_client is not None:
+        await redis_client.aclose()
+    if arq_pool is not None:
+        await arq_pool.aclose()
     client.close()
     logger.info("🔴 Sistem kapatıldı!")
 
@@ -61,19 +232,26 @@ app = FastAPI(
     title="Gelişmiş Bahis Tahmin Sistemi",
     description="58+ Ligden Veri Toplayan AI Destekli Gelişmiş Bahis Tahmin Sistemi",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Büyük liste yanıtları (datetime'lı yüzlerce belge) orjson ile serileştirilir
+    default_response_class=ORJSONResponse
 )
 
 # Create API router
 api_router = APIRouter(prefix="/api")
 
 # Add CORS middleware
+# Arayüz cookie / kimlik bilgisi göndermez; ALLOWED_ORIGINS (virgülle ayrılmış) tanımlı
+# değilse tüm origin'lere sabit "*" başlığı döner, origin yansıtılmaz
+ALLOWED_ORIGINS = frozenset(
+    origin.strip() for origin in os.environ.get('ALLOWED_ORIGINS', '*').split(',') if origin.strip()
+)
 app.add_middleware(
     CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_credentials=False,
+    allow_origins=sorted(ALLOWED_ORIGINS),
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
 )
 
 # Configure logging
@@ -100,21 +278,23 @@ async def get_system_status():
     try:
         await db.command("ping")
         
-        # Detaylı koleksiyon bilgileri
-        leagues_count = await db.leagues.count_documents({})
-        active_leagues = await db.leagues.count_documents({"active": True})
-        teams_count = await db.teams.count_documents({})
-        matches_count = await db.matches.count_documents({})
-        finished_matches = await db.matches.count_documents({"status": "finished"})
-        upcoming_matches = await db.matches.count_documents({"status": "scheduled"})
-        predictions_count = await db.predictions.count_documents({})
-        team_stats_count = await db.team_stats.count_documents({})
-        
-        # Son 24 saatteki aktivite
+        # Detaylı koleksiyon bilgileri ve son 24 saatteki aktivite; sayımlar birbirinden
+        # bağımsız olduğu için eşzamanlı yapılır, filtresiz toplamlar metadata'dan okunur
         since_24h = datetime.utcnow() - timedelta(hours=24)
-        recent_predictions = await db.predictions.count_documents({
-            "created_at": {"$gte": since_24h}
-        })
+        (
+            leagues_count, active_leagues, teams_count, matches_count, finished_matches,
+            upcoming_matches, predictions_count, team_stats_count, recent_predictions
+        ) = await asyncio.gather(
+            db.leagues.estimated_document_count(),
+            db.leagues.count_documents({"active": True}),
+            db.teams.estimated_document_count(),
+            db.matches.estimated_document_count(),
+            db.matches.count_documents({"status": "finished"}),
+            db.matches.count_documents({"status": "scheduled"}),
+            db.predictions.estimated_document_count(),
+            db.team_stats.estimated_document_count(),
+            db.predictions.count_documents({"created_at": {"$gte": since_24h}})
+        )
         
         return {
             "status": "healthy",
@@ -136,30 +316,46 @@ async def get_system_status():
         logger.error(f"Sistem durumu kontrolü hatası: {e}")
         raise HTTPException(status_code=500, detail="Sistem durumu kontrol edilemiyor")
 
+async def _refresh_leagues_cache(version: Optional[str] = None):
+    """Aktif ligleri sayımlarıyla birlikte yükleyip önbelleğe yaz"""
+    # _id Mongo tarafında string'e çevrilir
+    leagues = await db.leagues.aggregate([
+        {"$match": {"active": True}},
+        {"$project": LEAGUE_LIST_PROJECTION},
+        {"$addFields": {"_id": {"$toString": "$_id"}}}
+    ]).to_list(1000)
+    
+    enhanced_leagues = []
+    for league in leagues:
+        # Her lig için takım sayısını ekle
+        teams_count = await db.teams.count_documents({"league_id": league['id']})
+        matches_count = await db.matches.count_documents({"league_id": league['id']})
+        predictions_count = await db.predictions.count_documents({"league_id": league['id']})
+        
+        league['statistics'] = {
+            "teams": teams_count,
+            "matches": matches_count,
+            "predictions": predictions_count
+        }
+        
+        enhanced_leagues.append(league)
+    
+    _leagues_cache["data"] = {"leagues": enhanced_leagues, "count": len(enhanced_leagues)}
+    _leagues_cache["expires"] = time.monotonic() + LEAGUES_CACHE_TTL
+    _leagues_cache["version"] = version
+
 @api_router.get("/leagues")
 async def get_leagues():
     """Gelişmiş lig bilgileri"""
     try:
-        leagues = await db.leagues.find({"active": True}).to_list(1000)
-        
-        enhanced_leagues = []
-        for league in leagues:
-            league['_id'] = str(league['_id'])
-            
-            # Her lig için takım sayısını ekle
-            teams_count = await db.teams.count_documents({"league_id": league['id']})
-            matches_count = await db.matches.count_documents({"league_id": league['id']})
-            predictions_count = await db.predictions.count_documents({"league_id": league['id']})
-            
-            league['statistics'] = {
-                "teams": teams_count,
-                "matches": matches_count,
-                "predictions": predictions_count
-            }
-            
-            enhanced_leagues.append(league)
-        
-        return {"leagues": enhanced_leagues, "count": len(enhanced_leagues)}
+        version = await get_data_version(redis_client)
+        if _leagues_cache_stale(version):
+            async with _leagues_cache_lock:
+                # Kilidi bekleyen istekler ilk isteğin yüklediği veriyi kullanır
+                if _leagues_cache_stale(version):
+                    await _refresh_leagues_cache(version)
+        
+        return _leagues_cache["data"]
     except Exception as e:
         logger.error(f"Ligler getirilemedi: {e}")
         raise HTTPException(status_code=500, detail="Ligler getirilemedi")
@@ -168,7 +364,7 @@ async def get_leagues():
 async def get_teams_by_league(league_id: str):
     """Belirtilen ligin takımlarını detaylı bilgilerle getir"""
     try:
-        teams = await db.teams.find({"league_id": league_id}).to_list(1000)
+        teams = await db.teams.find({"league_id": league_id}, TEAM_LIST_PROJECTION).to_list(1000)
         
         enhanced_teams = []
         for team in teams:
@@ -188,7 +384,7 @@ async def get_teams_by_league(league_id: str):
             recent_matches = await db.matches.find({
                 "$or": [{"home_team_id": team['id']}, {"away_team_id": team['id']}],
                 "status": "finished"
-            }).sort("match_date", -1).limit(5).to_list(5)
+            }, {"_id": 1}).sort("match_date", -1).limit(5).to_list(5)
             
             team['recent_matches'] = len(recent_matches)
             enhanced_teams.append(team)
@@ -205,29 +401,29 @@ async def get_upcoming_matches(days: int = 7):
         end_date = datetime.utcnow() + timedelta(days=days)
         matches = await db.matches.find({
             "match_date": {"$gte": datetime.utcnow(), "$lte": end_date}
-        }).sort("match_date", 1).to_list(1000)
+        }, MATCH_LIST_PROJECTION).sort("match_date", 1).to_list(1000)
         
         enhanced_matches = []
         for match in matches:
             match['_id'] = str(match['_id'])
             
             # Takım isimlerini ekle
-            home_team = await db.teams.find_one({"id": match['home_team_id']})
-            away_team = await db.teams.find_one({"id": match['away_team_id']})
+            home_team = await db.teams.find_one({"id": match['home_team_id']}, NAME_PROJECTION)
+            away_team = await db.teams.find_one({"id": match['away_team_id']}, NAME_PROJECTION)
             
             if home_team and away_team:
                 match['home_team_name'] = home_team['name']
                 match['away_team_name'] = away_team['name']
                 
                 # Lig bilgisini ekle
-                league = await db.leagues.find_one({"id": match['league_id']})
+                league = await db.leagues.find_one({"id": match['league_id']}, NAME_PROJECTION)
                 if league:
                     match['league_name'] = league['name']
                 
                 # Bu maç için tahminleri ekle
                 predictions = await db.predictions.find({
                     "match_id": match['id']
-                }).to_list(10)
+                }, PREDICTION_LIST_PROJECTION).to_list(10)
                 
                 match['predictions'] = []
                 for pred in predictions:
@@ -249,22 +445,22 @@ async def get_recent_matches(days: int = 7):
         matches = await db.matches.find({
             "match_date": {"$gte": start_date, "$lte": datetime.utcnow()},
             "status": "finished"
-        }).sort("match_date", -1).to_list(1000)
+        }, MATCH_LIST_PROJECTION).sort("match_date", -1).to_list(1000)
         
         enhanced_matches = []
         for match in matches:
             match['_id'] = str(match['_id'])
             
             # Takım isimlerini ekle
-            home_team = await db.teams.find_one({"id": match['home_team_id']})
-            away_team = await db.teams.find_one({"id": match['away_team_id']})
+            home_team = await db.teams.find_one({"id": match['home_team_id']}, NAME_PROJECTION)
+            away_team = await db.teams.find_one({"id": match['away_team_id']}, NAME_PROJECTION)
             
             if home_team and away_team:
                 match['home_team_name'] = home_team['name']
                 match['away_team_name'] = away_team['name']
                 
                 # Lig bilgisini ekle
-                league = await db.leagues.find_one({"id": match['league_id']})
+                league = await db.leagues.find_one({"id": match['league_id']}, NAME_PROJECTION)
                 if league:
                     match['league_name'] = league['name']
                 
@@ -275,44 +471,57 @@ async def get_recent_matches(days: int = 7):
         logger.error(f"Son maçlar getirilemedi: {e}")
         raise HTTPException(status_code=500, detail="Son maçlar getirilemedi")
 
+async def _load_today_predictions(today_start: datetime) -> Dict[str, Any]:
+    """Bugünkü tahminleri takım, lig ve maç bilgileriyle yükle"""
+    today_end = today_start + timedelta(days=1)
+    
+    # match_date aralığı index'ten okunur; aralık sorgusundan sonra gelen confidence kolonu
+    # sıralamayı karşılamaz, o günün tahminleri bellekte ilk TODAY_PREDICTIONS_LIMIT için sıralanır
+    predictions = await db.predictions.find({
+        "match_date": {"$gte": today_start, "$lt": today_end}
+    }, PREDICTION_LIST_PROJECTION).sort("confidence", -1).limit(
+        TODAY_PREDICTIONS_LIMIT
+    ).to_list(TODAY_PREDICTIONS_LIMIT)
+    
+    enhanced_predictions = []
+    for prediction in predictions:
+        prediction['_id'] = str(prediction['_id'])
+        
+        # Takım ve lig bilgilerini ekle
+        home_team = await db.teams.find_one({"id": prediction['home_team_id']}, NAME_PROJECTION)
+        away_team = await db.teams.find_one({"id": prediction['away_team_id']}, NAME_PROJECTION)
+        league = await db.leagues.find_one({"id": prediction['league_id']}, NAME_PROJECTION)
+        
+        if home_team and away_team and league:
+            prediction['home_team_name'] = home_team['name']
+            prediction['away_team_name'] = away_team['name']
+            prediction['league_name'] = league['name']
+            
+            # Maç bilgilerini ekle
+            match = await db.matches.find_one({"id": prediction['match_id']}, MATCH_ODDS_PROJECTION)
+            if match:
+                prediction['match_time'] = match['match_date']
+                prediction['odds'] = {
+                    "1x2": match.get('odds_1x2'),
+                    "over_under": match.get('odds_over_under'),
+                    "btts": match.get('odds_btts')
+                }
+            
+            enhanced_predictions.append(prediction)
+    
+    return {"predictions": enhanced_predictions, "count": len(enhanced_predictions)}
+
 @api_router.get("/predictions/today")
 async def get_today_predictions():
     """Bugünkü gelişmiş tahminleri getir"""
     try:
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        
-        predictions = await db.predictions.find({
-            "match_date": {"$gte": today_start, "$lt": today_end}
-        }).sort("confidence", -1).to_list(1000)
-        
-        enhanced_predictions = []
-        for prediction in predictions:
-            prediction['_id'] = str(prediction['_id'])
-            
-            # Takım ve lig bilgilerini ekle
-            home_team = await db.teams.find_one({"id": prediction['home_team_id']})
-            away_team = await db.teams.find_one({"id": prediction['away_team_id']})
-            league = await db.leagues.find_one({"id": prediction['league_id']})
-            
-            if home_team and away_team and league:
-                prediction['home_team_name'] = home_team['name']
-                prediction['away_team_name'] = away_team['name']
-                prediction['league_name'] = league['name']
-                
-                # Maç bilgilerini ekle
-                match = await db.matches.find_one({"id": prediction['match_id']})
-                if match:
-                    prediction['match_time'] = match['match_date']
-                    prediction['odds'] = {
-                        "1x2": match.get('odds_1x2'),
-                        "over_under": match.get('odds_over_under'),
-                        "btts": match.get('odds_btts')
-                    }
-                
-                enhanced_predictions.append(prediction)
         
-        return {"predictions": enhanced_predictions, "count": len(enhanced_predictions)}
+        return await cached_response(
+            f"preds:today:{today_start.isoformat()}",
+            TODAY_PREDICTIONS_CACHE_TTL,
+            lambda: _load_today_predictions(today_start)
+        )
     except Exception as e:
         logger.error(f"Bugünkü tahminler getirilemedi: {e}")
         raise HTTPException(status_code=500, detail="Bugünkü tahminler getirilemedi")
@@ -321,16 +530,16 @@ async def get_today_predictions():
 async def get_all_predictions(limit: int = 50):
     """Tüm tahminleri gelişmiş bilgilerle getir"""
     try:
-        predictions = await db.predictions.find({}).sort("created_at", -1).limit(limit).to_list(limit)
+        predictions = await db.predictions.find({}, PREDICTION_LIST_PROJECTION).sort("created_at", -1).limit(limit).to_list(limit)
         
         enhanced_predictions = []
         for prediction in predictions:
             prediction['_id'] = str(prediction['_id'])
             
             # Takım ve lig bilgilerini ekle
-            home_team = await db.teams.find_one({"id": prediction['home_team_id']})
-            away_team = await db.teams.find_one({"id": prediction['away_team_id']})
-            league = await db.leagues.find_one({"id": prediction['league_id']})
+            home_team = await db.teams.find_one({"id": prediction['home_team_id']}, NAME_PROJECTION)
+            away_team = await db.teams.find_one({"id": prediction['away_team_id']}, NAME_PROJECTION)
+            league = await db.leagues.find_one({"id": prediction['league_id']}, NAME_PROJECTION)
             
             if home_team and away_team and league:
                 prediction['home_team_name'] = home_team['name']
@@ -388,6 +597,7 @@ async def generate_demo_data(background_tasks: BackgroundTasks):
             raise HTTPException(status_code=503, detail="Veri toplama servisi hazır değil")
         
         background_tasks.add_task(data_collector.generate_realistic_data)
+        background_tasks.add_task(invalidate_leagues_cache)
         
         return {
             "message": "Gelişmiş demo verisi oluşturma işlemi başlatıldı",
@@ -405,9 +615,10 @@ async def trigger_scraper(background_tasks: BackgroundTasks):
         if not scraper_manager:
             raise HTTPException(status_code=503, detail="Scraper servisi hazır değil")
         
-        # Önce demo veri oluştur, sonra scraper çalıştır
-        background_tasks.add_task(data_collector.generate_realistic_data)
-        background_tasks.add_task(scraper_manager.run_scraping_job, None)
+        # Önce demo veri oluştur, sonra scraper çalıştır; kuyruk varsa worker süreci yapar
+        if not await enqueue_job("scrape_job", None, generate_demo=True):
+            background_tasks.add_task(data_collector.generate_realistic_data)
+            background_tasks.add_task(scraper_manager.run_scraping_job, None)
         
         return {
             "message": "Gelişmiş veri toplama işlemi başlatıldı",
@@ -426,7 +637,8 @@ async def generate_predictions(background_tasks: BackgroundTasks):
         if not prediction_engine:
             raise HTTPException(status_code=503, detail="Tahmin servisi hazır değil")
         
-        background_tasks.add_task(prediction_engine.generate_predictions, None)
+        if not await enqueue_job("predict_job", None):
+            background_tasks.add_task(prediction_engine.generate_predictions, None)
         
         return {
             "message": "Gelişmiş tahmin üretme işlemi başlatıldı",
@@ -438,75 +650,91 @@ async def generate_predictions(background_tasks: BackgroundTasks):
         logger.error(f"Tahmin üretme başlatılamadı: {e}")
         raise HTTPException(status_code=500, detail="Tahmin üretme başlatılamadı")
 
+async def _load_performance_stats() -> Dict[str, Any]:
+    """30 / 7 günlük ve bahis türüne göre tahmin başarısını hesapla"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    
+    # Sonucu belli ve doğru çıkan tahmin
+    correct_expr = {"$cond": [
+        {"$and": [
+            {"$eq": ["$is_correct", True]},
+            {"$ne": [{"$type": "$actual_result"}, "missing"]}
+        ]},
+        1, 0
+    ]}
+    counts = {"_id": None, "total": {"$sum": 1}, "correct": {"$sum": correct_expr}}
+    
+    # Tüm sayımlar tek aggregate ile, 30 günlük created_at aralığı bir kez taranarak yapılır
+    result = await db.predictions.aggregate([
+        {"$match": {"created_at": {"$gte": thirty_days_ago}}},
+        {"$facet": {
+            "last_30_days": [{"$group": counts}],
+            "last_7_days": [
+                {"$match": {"created_at": {"$gte": seven_days_ago}}},
+                {"$group": counts}
+            ],
+            "by_bet_type": [
+                {"$match": {"bet_type": {"$in": PERFORMANCE_BET_TYPES}}},
+                {"$group": {**counts, "_id": "$bet_type"}}
+            ]
+        }}
+    ]).to_list(1)
+    
+    facets = result[0] if result else {"last_30_days": [], "last_7_days": [], "by_bet_type": []}
+    empty = {"total": 0, "correct": 0}
+    period_30d = facets["last_30_days"][0] if facets["last_30_days"] else empty
+    period_7d = facets["last_7_days"][0] if facets["last_7_days"] else empty
+    by_bet_type = {row["_id"]: row for row in facets["by_bet_type"]}
+    
+    # Bahis türüne göre performans
+    bet_type_stats = {}
+    for bet_type in PERFORMANCE_BET_TYPES:
+        row = by_bet_type.get(bet_type, empty)
+        total = row["total"]
+        correct = row["correct"]
+        
+        accuracy = (correct / total * 100) if total > 0 else 0
+        bet_type_stats[bet_type] = {
+            "total": total,
+            "correct": correct,
+            "accuracy": round(accuracy, 2)
+        }
+    
+    total_predictions_30d = period_30d["total"]
+    correct_predictions_30d = period_30d["correct"]
+    total_predictions_7d = period_7d["total"]
+    correct_predictions_7d = period_7d["correct"]
+    
+    accuracy_30d = (correct_predictions_30d / total_predictions_30d * 100) if total_predictions_30d > 0 else 0
+    accuracy_7d = (correct_predictions_7d / total_predictions_7d * 100) if total_predictions_7d > 0 else 0
+    
+    return {
+        "overall_performance": {
+            "last_30_days": {
+                "total_predictions": total_predictions_30d,
+                "correct_predictions": correct_predictions_30d,
+                "accuracy_percentage": round(accuracy_30d, 2)
+            },
+            "last_7_days": {
+                "total_predictions": total_predictions_7d,
+                "correct_predictions": correct_predictions_7d,
+                "accuracy_percentage": round(accuracy_7d, 2)
+            }
+        },
+        "bet_type_performance": bet_type_stats,
+        "timestamp": datetime.utcnow()
+    }
+
 @api_router.get("/stats/performance")
 async def get_performance_stats():
     """Gelişmiş sistem performans istatistikleri"""
     try:
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        
-        # 30 günlük performans
-        total_predictions_30d = await db.predictions.count_documents({
-            "created_at": {"$gte": thirty_days_ago}
-        })
-        
-        correct_predictions_30d = await db.predictions.count_documents({
-            "created_at": {"$gte": thirty_days_ago},
-            "actual_result": {"$exists": True},
-            "is_correct": True
-        })
-        
-        # 7 günlük performans
-        total_predictions_7d = await db.predictions.count_documents({
-            "created_at": {"$gte": seven_days_ago}
-        })
-        
-        correct_predictions_7d = await db.predictions.count_documents({
-            "created_at": {"$gte": seven_days_ago},
-            "actual_result": {"$exists": True},
-            "is_correct": True
-        })
-        
-        # Bahis türüne göre performans
-        bet_type_stats = {}
-        for bet_type in ["1X2", "O/U2.5", "BTTS"]:
-            total = await db.predictions.count_documents({
-                "bet_type": bet_type,
-                "created_at": {"$gte": thirty_days_ago}
-            })
-            correct = await db.predictions.count_documents({
-                "bet_type": bet_type,
-                "created_at": {"$gte": thirty_days_ago},
-                "actual_result": {"$exists": True},
-                "is_correct": True
-            })
-            
-            accuracy = (correct / total * 100) if total > 0 else 0
-            bet_type_stats[bet_type] = {
-                "total": total,
-                "correct": correct,
-                "accuracy": round(accuracy, 2)
-            }
-        
-        accuracy_30d = (correct_predictions_30d / total_predictions_30d * 100) if total_predictions_30d > 0 else 0
-        accuracy_7d = (correct_predictions_7d / total_predictions_7d * 100) if total_predictions_7d > 0 else 0
-        
-        return {
-            "overall_performance": {
-                "last_30_days": {
-                    "total_predictions": total_predictions_30d,
-                    "correct_predictions": correct_predictions_30d,
-                    "accuracy_percentage": round(accuracy_30d, 2)
-                },
-                "last_7_days": {
-                    "total_predictions": total_predictions_7d,
-                    "correct_predictions": correct_predictions_7d,
-                    "accuracy_percentage": round(accuracy_7d, 2)
-                }
-            },
-            "bet_type_performance": bet_type_stats,
-            "timestamp": datetime.utcnow()
-        }
+        return await cached_response(
+            f"stats:perf:30d:{datetime.utcnow().date().isoformat()}",
+            PERFORMANCE_STATS_CACHE_TTL,
+            _load_performance_stats
+        )
     except Exception as e:
         logger.error(f"Performans istatistikleri getirilemedi: {e}")
         raise HTTPException(status_code=500, detail="Performans istatistikleri getirilemedi")
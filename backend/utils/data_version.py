@@ -0,0 +1,29 @@
+"""API süreçleri ile arq worker'ı arasında paylaşılan veri sürümü
+
+Worker her scraping / tahmin işi bitince Redis'teki sayacı artırır. API süreçleri
+bellek içi lig önbelleğini ve Redis yanıt önbelleği anahtarlarını bu sürüme bağlar;
+böylece başka süreçte biten iş, eski verinin TTL boyunca sunulmasına yol açmaz.
+"""
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = "fut:data_version"
+
+
+async def get_data_version(redis) -> Optional[str]:
+    """Mevcut veri sürümü; Redis yoksa ya da okunamazsa None"""
+    if redis is None:
+        return None
+    try:
+        version = await redis.get(DATA_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Veri sürümü okunamadı: {e}")
+        return None
+    return version.decode() if version is not None else "0"
+
+
+async def bump_data_version(redis):
+    """Veri sürümünü artır; iş bittiğinde çağrılır"""
+    await redis.incr(DATA_VERSION_KEY)
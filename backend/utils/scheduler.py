@@ -9,10 +9,13 @@ from apscheduler.triggers.interval import IntervalTrigger
 logger = logging.getLogger(__name__)
 
 class SchedulerManager:
-    def __init__(self, db, scraper_manager, prediction_engine):
+    def __init__(self, db, scraper_manager, prediction_engine, enqueue_training=None):
         self.db = db
         self.scraper_manager = scraper_manager
         self.prediction_engine = prediction_engine
+        # Eğitimi iş kuyruğuna atan coroutine (bet_types -> bool); yoksa ya da False dönerse
+        # eğitim bu süreçte yapılır
+        self.enqueue_training = enqueue_training
         self.scheduler = AsyncIOScheduler()
         
         # Scheduler'ı yapılandır
@@ -162,10 +165,13 @@ class SchedulerManager:
         try:
             logger.info("🎓 Haftalık model eğitimi başladı")
             
-            # Tüm modelleri yeniden eğit
-            for bet_type in ['1X2', 'O/U2.5', 'BTTS']:
-                await self.prediction_engine.train_model(bet_type)
-                logger.info(f"Model eğitildi: {bet_type}")
+            # Tüm modelleri aynı eğitim matrisinden yeniden eğit; kuyruk varsa worker eğitir
+            bet_types = ['1X2', 'O/U2.5', 'BTTS']
+            if self.enqueue_training and await self.enqueue_training(bet_types):
+                logger.info(f"Model eğitimi kuyruğa alındı: {', '.join(bet_types)}")
+            else:
+                await self.prediction_engine.train_models(bet_types)
+                logger.info(f"Modeller eğitildi: {', '.join(bet_types)}")
             
             # System log
             await self._log_job_completion("weekly_training", "success")
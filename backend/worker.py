@@ -0,0 +1,92 @@
+"""Uzun süren scraping / tahmin / model eğitimi işleri için arq worker'ı
+
+API bu işleri Redis kuyruğuna atar; worker ayrı bir süreçte çalışır:
+
+    arq worker.WorkerSettings
+"""
+import os
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+from arq.connections import RedisSettings
+
+from scrapers.scraper_manager import ScraperManager
+from prediction.prediction_engine import PredictionEngine
+from enhanced_data_collector import EnhancedDataCollector
+from utils.data_version import bump_data_version
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Motor'un thread havuzu bağlantı havuzuyla aynı boyutta (bkz. server.py)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+os.environ.setdefault('MOTOR_MAX_WORKERS', str(MONGO_MAX_POOL_SIZE))
+from motor.motor_asyncio import AsyncIOMotorClient
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Tam scraping turu 58+ lig için uzun sürebilir
+JOB_TIMEOUT = 3 * 60 * 60  # saniye
+
+async def startup(ctx):
+    """Worker süreci için Mongo client'ı ve servisleri hazırla"""
+    ctx['client'] = AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        serverSelectionTimeoutMS=5000,
+        retryWrites=True
+    )
+    db = ctx['client'][os.environ['DB_NAME']]
+    
+    ctx['scraper_manager'] = ScraperManager(db)
+    # Modeller yalnızca train_job ile eğitilir; başlangıçta ve tahminde mevcut dosyalar yüklenir
+    ctx['prediction_engine'] = PredictionEngine(db, train_in_process=False)
+    ctx['data_collector'] = EnhancedDataCollector(db)
+    
+    await ctx['data_collector'].check_server_version()
+    await ctx['scraper_manager'].startup()
+    try:
+        await ctx['prediction_engine'].initialize_models()
+    except Exception as e:
+        logger.warning(f"Tahmin modelleri başlatılamadı: {e}")
+    
+    logger.info("🛠️ Worker başlatıldı")
+
+async def shutdown(ctx):
+    """Worker kapanırken bağlantıları kapat"""
+    await ctx['scraper_manager'].shutdown()
+    ctx['client'].close()
+    logger.info("🔴 Worker kapatıldı")
+
+async def scrape_job(ctx, league_ids=None, generate_demo=False):
+    """Scraping işini çalıştır; istenirse önce demo verisi oluştur"""
+    try:
+        if generate_demo:
+            await ctx['data_collector'].generate_realistic_data()
+        await ctx['scraper_manager'].run_scraping_job(league_ids)
+    finally:
+        # API süreçlerindeki lig / yanıt önbellekleri yeni veriyi görsün
+        await bump_data_version(ctx['redis'])
+
+async def predict_job(ctx, match_ids=None):
+    """Tahmin üretme işini çalıştır (değişen model dosyaları önce yeniden yüklenir)"""
+    try:
+        await ctx['prediction_engine'].generate_predictions(match_ids)
+    finally:
+        await bump_data_version(ctx['redis'])
+
+async def train_job(ctx, bet_types=None):
+    """Modelleri yeniden eğit ve kaydet; diğer süreçler sonraki tahminde yeni dosyaları yükler"""
+    engine = ctx['prediction_engine']
+    await engine.train_models(bet_types or list(engine.model_configs.keys()))
+
+class WorkerSettings:
+    functions = [scrape_job, predict_job, train_job]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(os.environ.get('REDIS_URL', 'redis://localhost:6379'))
+    job_timeout = JOB_TIMEOUT